@@ -1,22 +1,73 @@
+import time
+START_TIME = time.perf_counter()  # Zero point of the startup report
 import pygame
 import math
-import time
+import os
+import csv
+import json
 import random
+import heapq
+import argparse
+from collections import OrderedDict, deque
+import numpy as np
 
-# Initialize Pygame
-pygame.init()
+# Pygame subsystems are brought up on demand: the display by init_display(), fonts by the first
+# LazyFont that draws. Audio is never used, so it is never initialised.
 
-# --- FULLSCREEN SETUP ---
-screen_info = pygame.display.Info()
-WIDTH, HEIGHT = screen_info.current_w, screen_info.current_h
-screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
-pygame.display.set_caption("florr.io Clone - Fully Restored")
-clock = pygame.time.Clock()
+# --- DISPLAY ---
+# Created by init_display(); importing this module never opens a window
+HEADLESS_SIZE = (1280, 720)
+WIDTH, HEIGHT = HEADLESS_SIZE
+screen, clock = None, None
 
 # --- FONTS ---
-font_sm = pygame.font.SysFont("Arial", 11, bold=True)
-font_md = pygame.font.SysFont("Arial", 18, bold=True)
-font_lg = pygame.font.SysFont("Arial", 48, bold=True)
+# Font files are looked up in the system catalog once and remembered here across runs
+FONT_CACHE_PATH = os.path.join(os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), "florrio", "fonts.json")
+_font_paths = None
+
+def resolve_font(name, bold=False):
+    """(path, synthetic_bold) for a system font, as SysFont would pick it. The catalog scan behind
+    match_font is the slow part of font setup, so answers are cached in FONT_CACHE_PATH."""
+    global _font_paths
+    if _font_paths is None:
+        try:
+            with open(FONT_CACHE_PATH) as f: _font_paths = json.load(f)
+        except (OSError, ValueError):
+            _font_paths = {}
+    key = f"{name}|{'bold' if bold else 'regular'}"
+    entry = _font_paths.get(key)
+    if entry is None or (entry["path"] and not os.path.exists(entry["path"])):
+        path = pygame.font.match_font(name, bold=bold)
+        # No separate bold face (or no match at all, so the default font): embolden at render time
+        entry = _font_paths[key] = {"path": path, "synthetic_bold": bold and (path is None or path == pygame.font.match_font(name))}
+        try:
+            os.makedirs(os.path.dirname(FONT_CACHE_PATH), exist_ok=True)
+            with open(FONT_CACHE_PATH, "w") as f: json.dump(_font_paths, f, indent=2)
+        except OSError:
+            pass  # Read-only home: resolve again next run
+    return entry["path"], entry["synthetic_bold"]
+
+class LazyFont:
+    """Stands in for a pygame Font and creates it on first use, so nothing about fonts is paid
+    for until a frame draws text. Attribute access is forwarded to the real font."""
+    def __init__(self, name, size, bold=False):
+        self.name, self.size, self.bold = name, size, bold
+        self._font = None
+    def load(self):
+        if self._font is None:
+            t0 = time.perf_counter()
+            if not pygame.font.get_init(): pygame.font.init()
+            path, synthetic_bold = resolve_font(self.name, self.bold)
+            self._font = pygame.font.Font(path, self.size)
+            if synthetic_bold: self._font.set_bold(True)
+            startup.fonts_ms += (time.perf_counter() - t0) * 1000
+        return self._font
+    def __getattr__(self, attr):
+        return getattr(self.load(), attr)
+
+font_sm = LazyFont("Arial", 11, bold=True)
+font_md = LazyFont("Arial", 18, bold=True)
+font_lg = LazyFont("Arial", 48, bold=True)
 
 # --- CONSTANTS ---
 MAP_GREEN, GRID_COLOR = (34, 139, 34), (30, 120, 30)
@@ -33,6 +84,35 @@ BEE_COUNT = 30
 BEE_RESPAWN_TIME = 15.0
 QUEEN_RESPAWN_TIME = 60.0
 MISSILE_RANGE = 600
+MISSILE_LIFETIME, MISSILE_RELOAD_TIME = 4.0, 2.0
+MISSILE_SPEED, MISSILE_DAMAGE = 7.5, 15
+MISSILE_POOL_SIZE = 256  # Initial projectile capacity; the pool doubles if an emitter outgrows it
+LOOT_CAP, LOOT_TTL = 500, 120.0  # Max drops on the ground, seconds before a drop despawns
+LOOT_MERGE_RADIUS = 40  # Same-type drops closer than this stack into one
+REGEN_INTERVAL = 2.0  # Seconds without attacking before regen starts, and between regen pulses
+PLAYER_MAX_HEALTH, REGEN_AMOUNT = 100, 2
+PLAYER_ROTATION_SPEED, PLAYER_PETAL_RANGE = 0.04, 85  # Starting petal orbit rate and radius, before buffs
+PLAYER_EASE = 0.025  # Share of the mouse offset the player covers per tick
+HIT_COOLDOWN = 0.3  # Seconds after a contact hit before the player can take another
+BEE_CONTACT_REACH, BEE_CONTACT_DAMAGE, BEE_KNOCKBACK = 50, 15, 45
+QUEEN_CONTACT_REACH, QUEEN_CONTACT_DAMAGE, QUEEN_KNOCKBACK = 100, 30, 60
+MISSILE_HIT_REACH, LOOT_PICKUP_REACH = 30, 35  # Centre distances from the player
+PETAL_BEE_REACH, PETAL_QUEEN_REACH = 37, 85  # Centre distances from a petal
+BEE_XP, QUEEN_XP = 25, 250
+QUEEN_LOOT = ((-30, 0, "Glass"), (30, 0, "Glass"), (0, 30, "Stinger"))  # Offset and petal of each drop on the queen's death
+SIM_HZ = 60
+SIM_DT = 1.0 / SIM_HZ  # Every per-step constant (speeds, easing, orbit rate) is tuned for this tick
+MAX_FRAME_TIME = 0.25  # Cap on real time fed to the accumulator per frame, avoids the spiral of death
+TEXT_CACHE_SIZE = 512  # Rendered label surfaces kept alive by the LRU text cache
+ROTATION_STEPS = 64  # Distinct pre-rendered orientations per rotating sprite
+PROFILE_WINDOW = 600  # Frames kept for the rolling frame-time percentiles
+PROFILE_ENV = "FLORRIO_PROFILE"  # Set to an output path prefix to profile from startup and export on exit
+PROFILE_PHASES = ("events", "player", "missiles", "queen", "bees", "loot", "petals", "timers", "world", "hud", "flip", "idle")
+CHUNK_SIZE = 1000  # Edge of a simulation chunk; chunks within RADAR_RANGE of the player or on screen are awake
+BEE_OVERHANG = 40  # Crown and label drawn beyond a bee's radius
+CHUNK_LOD_INTERVAL = 30  # Ticks between the coarse steps that move chasing bees in dormant chunks
+INVENTORY_COLS, INVENTORY_CELL = 8, 110  # Inventory grid columns and slot pitch in pixels
+GRID_CELL_SIZE = 128  # Broadphase cell edge; queries scan as many cells as their reach covers, so this only tunes speed
 
 # Game States
 STATE_GAME, STATE_INVENTORY, STATE_DEAD, STATE_BUFFS = 0, 1, 2, 3
@@ -40,30 +120,296 @@ current_state = STATE_GAME
 
 # --- CLASSES ---
 
-class QueenMissile:
-    def __init__(self, x, y, target_pos):
-        self.pos = [x, y]
-        self.speed = 7.5
-        dx, dy = target_pos[0] - x, target_pos[1] - y
-        dist = math.hypot(dx, dy)
-        self.vel = [(dx/dist)*self.speed, (dy/dist)*self.speed]
-        self.angle = math.atan2(dy, dx)
-        self.damage = 15
-        self.alive = True
-        self.spawn_time = time.time()
+class SimClock:
+    """Simulation time in seconds plus the timer queue hanging off it. Time advances by exactly
+    SIM_DT per tick; entities register deadlines with `call_later` instead of polling the clock,
+    so a tick only pays for the timers that actually expire in it."""
+    def __init__(self, start=10.0):
+        # Start past every cooldown window so zero-initialised timestamps read as "long ago"
+        self.now, self.ticks = start, 0
+        self.time_scale, self.paused = 1.0, False  # Sim ticks run per requested tick, applied by advance()
+        self._timers, self._seq, self._carry = [], 0, 0.0
+    def call_at(self, when, fn, *args):
+        """Run fn(*args) on the first tick at or after `when`. Returns a handle for `cancel`."""
+        self._seq += 1
+        timer = [when, self._seq, fn, args]
+        heapq.heappush(self._timers, timer)
+        return timer
+    def call_later(self, delay, fn, *args):
+        return self.call_at(self.now + delay, fn, *args)
+    def cancel(self, timer):
+        if timer is not None: timer[2] = None  # Lazily dropped when it reaches the top of the heap
+    def pending(self):
+        return sum(1 for t in self._timers if t[2] is not None)
+    def scaled(self, ticks):
+        """Ticks to run for `ticks` requested: none while paused, else scaled by time_scale with
+        the fraction carried over, so 0.5 runs every other tick and 2.0 runs two."""
+        if self.paused: return 0
+        self._carry += ticks * self.time_scale
+        n = int(self._carry); self._carry -= n
+        return n
+    def alpha(self, pending):
+        """Render interpolation factor: the scaled share of a tick owed, `pending` being real ticks not yet passed to scaled()."""
+        return min(1.0, self._carry + pending * self.time_scale)
+    def tick(self, dt=SIM_DT):
+        self.now += dt; self.ticks += 1
+        timers = self._timers
+        while timers and timers[0][0] <= self.now:
+            _, _, fn, args = heapq.heappop(timers)
+            if fn is not None: fn(*args)
 
-    def update(self):
-        self.pos[0] += self.vel[0]
-        self.pos[1] += self.vel[1]
-        if time.time() - self.spawn_time > 4.0: self.alive = False
+class FrameProfiler:
+    """Opt-in per-frame instrumentation. `lap(phase)` charges the time since the previous lap to
+    `phase`, so the main loop reads top to bottom with a lap after each stage; `count` tallies
+    entities and collision tests. Disabled, every call returns immediately. It is enabled while the
+    overlay is up, and for the whole run when `export_prefix` is set; only then is every frame kept."""
+    def __init__(self, export_prefix=None, window=PROFILE_WINDOW):
+        self.export_prefix, self.show_overlay = export_prefix, False
+        self.enabled = bool(export_prefix)
+        self.frames = deque(maxlen=window)  # (frame_ns, {phase: ns}, {counter: n})
+        self.rows = []  # Every frame since startup, for export; filled only with an export prefix
+        self.phases, self.counts = {}, {}
+        self._frame_start = self._last = None
+    def begin_frame(self):
+        if not self.enabled: return
+        now = time.perf_counter_ns()
+        if self._frame_start is not None:
+            record = (now - self._frame_start, self.phases, self.counts)
+            self.frames.append(record)
+            if self.export_prefix: self.rows.append(record)
+        self.phases, self.counts = {}, {}
+        self._frame_start = self._last = now
+    def lap(self, phase):
+        if not self.enabled or self._last is None: return
+        now = time.perf_counter_ns()
+        self.phases[phase] = self.phases.get(phase, 0) + now - self._last
+        self._last = now
+    def count(self, name, n=1):
+        if self.enabled: self.counts[name] = self.counts.get(name, 0) + n
+    def toggle_overlay(self):
+        self.show_overlay = not self.show_overlay
+        self.enabled = self.show_overlay or bool(self.export_prefix)
+        if not self.enabled: self._frame_start = self._last = None  # Do not count the hidden stretch as one frame
+    def percentiles(self, qs=(50, 95, 99)):
+        """Rolling frame-time percentiles in milliseconds."""
+        if not self.frames: return dict.fromkeys(qs, 0.0)
+        values = np.percentile(np.fromiter((f[0] for f in self.frames), dtype=np.int64), qs) / 1e6
+        return dict(zip(qs, values.tolist()))
+    def phase_means(self):
+        n = max(1, len(self.frames))
+        return {ph: sum(f[1].get(ph, 0) for f in self.frames) / n / 1e6 for ph in PROFILE_PHASES}
+    def draw(self, surface, font, extra=()):
+        # Rendered with the font directly: numbers change every frame and would only churn text_cache
+        pct = self.percentiles()
+        last = self.frames[-1][2] if self.frames else {}
+        lines = [f"frame p50 {pct[50]:.2f}  p95 {pct[95]:.2f}  p99 {pct[99]:.2f} ms"]
+        lines += [f"{ph:<9}{ms:7.3f} ms" for ph, ms in self.phase_means().items()]
+        lines += [f"{name}: {n}" for name, n in sorted(last.items())] + list(extra)
+        panel = pygame.Surface((260, 14 * len(lines) + 10), pygame.SRCALPHA); panel.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines): panel.blit(font.render(line, True, (230, 230, 230)), (6, 5 + 14 * i))
+        surface.blit(panel, (10, 70))
+    def export(self, prefix):
+        """Write a summary to `<prefix>.json` and one row per recorded frame to `<prefix>.csv`."""
+        counters = sorted({k for _, _, c in self.rows for k in c})
+        summary = {"frames": len(self.rows), "frame_ms": self.percentiles(), "phase_ms_mean": self.phase_means(),
+                   "counts_mean": {k: sum(c.get(k, 0) for _, _, c in self.rows) / max(1, len(self.rows)) for k in counters}}
+        with open(prefix + ".json", "w") as f: json.dump(summary, f, indent=2)
+        with open(prefix + ".csv", "w", newline="") as f:
+            out = csv.writer(f); out.writerow(["frame_ns", *PROFILE_PHASES, *counters])
+            for frame_ns, phases, counts in self.rows:
+                out.writerow([frame_ns, *(phases.get(ph, 0) for ph in PROFILE_PHASES), *(counts.get(k, 0) for k in counters)])
 
-    def draw(self, surface, cam_x, cam_y):
-        sx, sy = self.pos[0] - cam_x, self.pos[1] - cam_y
-        p1 = (sx + math.cos(self.angle)*15, sy + math.sin(self.angle)*15)
-        p2 = (sx + math.cos(self.angle + 2.5)*10, sy + math.sin(self.angle + 2.5)*10)
-        p3 = (sx + math.cos(self.angle - 2.5)*10, sy + math.sin(self.angle - 2.5)*10)
-        pygame.draw.polygon(surface, (255, 50, 50), [p1, p2, p3])
-        pygame.draw.polygon(surface, (255, 255, 255), [p1, p2, p3], 1)
+class StartupTimer:
+    """Milliseconds from the start of this module's import to named milestones, up to the first
+    presented frame. A milestone keeps its first time, so restarts after death do not move it."""
+    def __init__(self, start):
+        self.start, self.marks = start, {}
+        self.fonts_ms = 0.0  # Resolving and loading fonts, wherever it happened
+    def mark(self, name):
+        self.marks.setdefault(name, (time.perf_counter() - self.start) * 1000)
+    def summary(self):
+        return {**{f"{k}_ms": v for k, v in self.marks.items()}, "fonts_ms": self.fonts_ms}
+    def report(self, path=None):
+        """Print the milestones; with `path`, also append them as one JSON line so runs can be compared."""
+        print("startup: " + ", ".join(f"{k} {v:.1f} ms" for k, v in self.marks.items()) + f" (fonts {self.fonts_ms:.1f} ms)")
+        if path:
+            with open(path, "a") as f: f.write(json.dumps(self.summary()) + "\n")
+
+class SpatialHash:
+    """Uniform grid over world space. Objects are bucketed by the cell their `pos` falls in,
+    so radius queries only touch the handful of cells around the query point."""
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self.cells, self.keys = {}, {}  # cell -> {obj: None} (ordered set), obj -> cell
+    def _cell(self, x, y):
+        return (int(x // self.cell_size), int(y // self.cell_size))
+    def insert(self, obj):
+        key = self._cell(obj.pos[0], obj.pos[1])
+        self.cells.setdefault(key, {})[obj] = None
+        self.keys[obj] = key
+    def remove(self, obj):
+        key = self.keys.pop(obj, None)
+        if key is None: return
+        bucket = self.cells[key]; del bucket[obj]
+        if not bucket: del self.cells[key]
+    def clear(self):
+        self.cells.clear(); self.keys.clear()
+    def query(self, x, y, radius):
+        """Candidates whose cell overlaps the square around (x, y); callers do the exact distance test."""
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+    def query_rect(self, x0, y0, x1, y1):
+        cs, cells, found = self.cell_size, self.cells, []
+        for cx in range(int(x0 // cs), int(x1 // cs) + 1):
+            for cy in range(int(y0 // cs), int(y1 // cs) + 1):
+                bucket = cells.get((cx, cy))
+                if bucket: found.extend(bucket)
+        return found
+    def __len__(self):
+        return len(self.keys)
+
+class CellIndex:
+    """Read-only grid index over rows of a point array, for many queries at once. Rows are sorted
+    by cell key so each grid column is one contiguous run found with two binary searches; rebuild
+    it after the points move. Returns candidates only; callers do the exact distance test."""
+    def __init__(self, pos, rows=None, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        cells = np.floor_divide(pos if rows is None else pos[rows], cell_size).astype(np.int64)
+        keys = self._cell_keys(cells[:, 0], cells[:, 1])
+        order = np.argsort(keys, kind="stable")
+        self.order, self.keys = order if rows is None else rows[order], keys[order]
+    def __len__(self): return len(self.order)
+    @staticmethod
+    def _cell_keys(cx, cy):
+        return (cx + (1 << 20)) * (1 << 21) + (cy + (1 << 20))
+    def query_rect(self, x0, y0, x1, y1):
+        cs = self.cell_size
+        cy0, cy1 = int(y0 // cs), int(y1 // cs)
+        cols = np.arange(int(x0 // cs), int(x1 // cs) + 1)
+        lo = np.searchsorted(self.keys, self._cell_keys(cols, cy0), "left")
+        hi = np.searchsorted(self.keys, self._cell_keys(cols, cy1), "right")
+        return np.concatenate([self.order[a:b] for a, b in zip(lo, hi)])
+    def candidates(self, xy, reach):
+        """(point, row) pairs for every point in the (m, 2) array `xy` and every row in a cell
+        overlapping the square of half-width `reach` around it."""
+        none = np.empty(0, dtype=np.int64)
+        if len(xy) == 0 or len(self.order) == 0: return none, none
+        c0 = np.floor_divide(xy - reach, self.cell_size).astype(np.int64)
+        c1 = np.floor_divide(xy + reach, self.cell_size).astype(np.int64)
+        pts, cand = [none], [none]
+        for dx in range(int((c1[:, 0] - c0[:, 0]).max()) + 1):
+            cols = c0[:, 0] + dx
+            lo = np.searchsorted(self.keys, self._cell_keys(cols, c0[:, 1]), "left")
+            hi = np.searchsorted(self.keys, self._cell_keys(cols, c1[:, 1]), "right")
+            n = np.where(cols <= c1[:, 0], hi - lo, 0)
+            start = np.repeat(lo - (np.cumsum(n) - n), n)  # Flat run position -> index into order
+            pts.append(np.repeat(np.arange(len(xy)), n)); cand.append(self.order[start + np.arange(n.sum())])
+        return np.concatenate(pts), np.concatenate(cand)
+
+class TextCache:
+    """Bounded LRU of rendered text surfaces keyed by (font, text, color, antialias). Labels like
+    "Bee" or "INVENTORY" are rasterised once instead of every frame."""
+    def __init__(self, maxsize=TEXT_CACHE_SIZE):
+        self.maxsize, self.surfaces = maxsize, OrderedDict()
+        self.hits = self.misses = 0
+    def render(self, font, text, antialias, color):
+        key = (font, text, tuple(color), antialias)
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.hits += 1; self.surfaces.move_to_end(key)
+            return surf
+        self.misses += 1
+        surf = self.surfaces[key] = font.render(text, antialias, color)
+        if len(self.surfaces) > self.maxsize: self.surfaces.popitem(last=False)
+        return surf
+    def clear(self):
+        self.surfaces.clear(); self.hits = self.misses = 0
+
+class SpriteCache:
+    """Entity sprites rasterised once. Each entry is (surface, anchor) where anchor is the pixel
+    that lands on the entity's screen position. The key carries everything that changes the
+    look (radius, colour, flash state), so a new look simply misses and builds a fresh sprite."""
+    def __init__(self):
+        self.sprites = {}
+    def get(self, key, build, *args):
+        sprite = self.sprites.get(key)
+        if sprite is None: sprite = self.sprites[key] = build(*args)
+        return sprite
+    def rotated(self, key, angle, build, *args):
+        """Sprite for `angle` snapped to one of ROTATION_STEPS orientations; `build` gets the snapped angle."""
+        step = round(angle * ROTATION_STEPS / (2 * math.pi)) % ROTATION_STEPS
+        return self.get(key + (step,), build, step * 2 * math.pi / ROTATION_STEPS, *args)
+    def clear(self):
+        self.sprites.clear()
+
+class MissilePool:
+    """Preallocated struct-of-arrays store for projectiles from any number of emitters. Live
+    missiles occupy rows [0, n); dead rows are refilled by swap-remove so the live block stays
+    contiguous and movement, expiry and hit tests are single array operations."""
+    def __init__(self, capacity=MISSILE_POOL_SIZE, lifetime=MISSILE_LIFETIME):
+        self.lifetime, self.n = lifetime, 0
+        self.tests = 0  # Distance tests since the profiler last read it
+        self.pos, self.prev_pos, self.vel = np.zeros((capacity, 2)), np.zeros((capacity, 2)), np.zeros((capacity, 2))
+        self.angle, self.spawn_time = np.zeros(capacity), np.zeros(capacity)
+        self.damage = np.zeros(capacity, dtype=np.int64)
+    def _columns(self):
+        return ("pos", "prev_pos", "vel", "angle", "spawn_time", "damage")
+    def __len__(self): return self.n
+    def clear(self): self.n = 0
+    def fire(self, x, y, target_pos, count=1, spread=0.0, speed=MISSILE_SPEED, damage=MISSILE_DAMAGE):
+        """Emit `count` missiles from (x, y), fanned evenly across `spread` radians around the aim at target_pos."""
+        aim = math.atan2(target_pos[1] - y, target_pos[0] - x)
+        angles = aim + (np.linspace(-spread / 2, spread / 2, count) if count > 1 else np.zeros(1))
+        if self.n + count > len(self.angle):
+            cap = max(len(self.angle) * 2, self.n + count)
+            for name in self._columns():
+                old = getattr(self, name); new = np.zeros((cap,) + old.shape[1:], dtype=old.dtype)
+                new[:self.n] = old[:self.n]; setattr(self, name, new)
+        rows = slice(self.n, self.n + count)
+        self.pos[rows] = self.prev_pos[rows] = (x, y)
+        self.vel[rows, 0], self.vel[rows, 1] = np.cos(angles) * speed, np.sin(angles) * speed
+        self.angle[rows], self.spawn_time[rows], self.damage[rows] = angles, sim_clock.now, damage
+        self.n += count
+    def kill(self, idx):
+        """Swap-remove rows `idx`: live rows from the tail move into the holes left in the head."""
+        dead = np.unique(idx)
+        if len(dead) == 0: return
+        n_new = self.n - len(dead)
+        holes = dead[dead < n_new]
+        tail = np.arange(n_new, self.n); movers = tail[~np.isin(tail, dead)]
+        for name in self._columns():
+            col = getattr(self, name); col[holes] = col[movers]
+        self.n = n_new
+    def snapshot(self):
+        self.prev_pos[:self.n] = self.pos[:self.n]
+    def update(self):
+        n = self.n
+        self.pos[:n] += self.vel[:n]
+        self.kill(np.flatnonzero(sim_clock.now - self.spawn_time[:n] >= self.lifetime))
+    def hits(self, x, y, reach):
+        """Indices of live missiles closer than `reach` to (x, y)."""
+        self.tests += self.n
+        d = self.pos[:self.n] - (x, y)
+        return np.flatnonzero(np.hypot(d[:, 0], d[:, 1]) < reach)
+    def pairs(self, xy, reach):
+        """(point, missile) index pairs closer than `reach`, for every point in the (m, 2) array `xy`.
+        One point tests every missile directly; several (the server's players) go through a CellIndex."""
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        if len(xy) <= 1:
+            self.tests += self.n * len(xy)
+            d = self.pos[None, :self.n] - xy[:, None]
+            return np.nonzero(np.hypot(d[..., 0], d[..., 1]) < reach)
+        p, m = CellIndex(self.pos[:self.n]).candidates(xy, reach); self.tests += len(m)
+        keep = np.hypot(self.pos[m, 0] - xy[p, 0], self.pos[m, 1] - xy[p, 1]) < reach
+        return p[keep], m[keep]
+    def draw(self, surface, cam_x, cam_y, alpha=1.0):
+        n, (w, h) = self.n, surface.get_size()
+        xy = self.prev_pos[:n] + (self.pos[:n] - self.prev_pos[:n]) * alpha - (cam_x, cam_y)
+        vis = np.flatnonzero((xy[:, 0] > -30) & (xy[:, 0] < w + 30) & (xy[:, 1] > -30) & (xy[:, 1] < h + 30))
+        blits = []
+        for (sx, sy), angle in zip(xy[vis].astype(int).tolist(), self.angle[vis].tolist()):
+            surf, (ax, ay) = sprite_cache.rotated(("missile",), angle, build_missile_sprite)
+            blits.append((surf, (sx - ax, sy - ay)))
+        surface.blits(blits, False)
 
 class Petal:
     def __init__(self, name, color, damage=20, shape="circle", cooldown=3.0):
@@ -71,139 +417,446 @@ class Petal:
         self.cooldown_time = cooldown
         self.last_hit_time, self.is_active = 0, True
         self.radius = 12
-    def update(self):
-        if not self.is_active and time.time() - self.last_hit_time >= self.cooldown_time:
-            self.is_active = True
     def trigger_cooldown(self):
-        self.is_active, self.last_hit_time = False, time.time()
+        if self.is_active: sim_clock.call_later(self.cooldown_time, self.reactivate)
+        self.is_active, self.last_hit_time = False, sim_clock.now
+    def reactivate(self):
+        self.is_active = True
 
 class DroppedPetal:
-    def __init__(self, x, y, petal_type):
-        self.pos, self.type = [x, y], petal_type
+    def __init__(self, x, y, petal_type, count=1):
+        self.pos, self.type, self.count = [x, y], petal_type, count
         if petal_type == "Basic": self.color, self.shape, self.dmg, self.cd = BASIC_COLOR, "circle", 20, 3.0
         elif petal_type == "Light": self.color, self.shape, self.dmg, self.cd = LIGHT_COLOR, "circle", 20, 1.5
         elif petal_type == "Glass": self.color, self.shape, self.dmg, self.cd = GLASS_COLOR, "square", 40, 3.0
         elif petal_type == "Stinger": self.color, self.shape, self.dmg, self.cd = STINGER_COLOR, "circle", 80, 6.0
         self.radius = 10
+        self.despawn = None  # SimClock timer handle for the TTL expiry
     def draw(self, surface, cam_x, cam_y):
         sx, sy = int(self.pos[0] - cam_x), int(self.pos[1] - cam_y)
-        if self.shape == "square":
-            pygame.draw.rect(surface, self.color, (sx-10, sy-10, 20, 20))
-            pygame.draw.rect(surface, (255, 255, 255), (sx-10, sy-10, 20, 20), 2)
-        else:
-            pygame.draw.circle(surface, self.color, (sx, sy), self.radius)
-            pygame.draw.circle(surface, (255, 255, 255), (sx, sy), self.radius, 2)
-        txt = font_sm.render(self.type, True, (255, 255, 255))
-        surface.blit(txt, (sx - txt.get_width()//2, sy + 15))
+        surf, (ax, ay) = sprite_cache.get(("loot", self.shape, self.color, self.radius), build_loot_sprite, self.shape, self.color, self.radius)
+        txt = text_cache.render(font_sm, self.type if self.count == 1 else f"{self.type} x{self.count}", True, (255, 255, 255))
+        surface.blits(((surf, (sx - ax, sy - ay)), (txt, (sx - txt.get_width()//2, sy + 15))), False)
 
-class BeeMob:
-    def __init__(self, x, y, is_queen=False):
+class LootManager:
+    """Dropped petals on the ground. Same-type drops landing close together stack, every drop
+    despawns `ttl` seconds after it last grew, and past `cap` the oldest drop is evicted. A
+    spatial hash serves pickup and on-screen lookups."""
+    def __init__(self, cap=LOOT_CAP, ttl=LOOT_TTL, merge_radius=LOOT_MERGE_RADIUS):
+        self.cap, self.ttl, self.merge_radius = cap, ttl, merge_radius
+        self.drops, self.grid = {}, SpatialHash()  # drop -> None, oldest first
+        self.tests = 0
+    def __len__(self): return len(self.drops)
+    def __iter__(self): return iter(list(self.drops))
+    def drop(self, x, y, petal_type, count=1):
+        for d in self.grid.query(x, y, self.merge_radius):
+            if d.type == petal_type and math.hypot(d.pos[0]-x, d.pos[1]-y) < self.merge_radius:
+                d.count += count
+                del self.drops[d]; self.drops[d] = None  # Freshly topped-up: newest for eviction and TTL
+                sim_clock.cancel(d.despawn); d.despawn = sim_clock.call_later(self.ttl, self.remove, d)
+                return d
+        d = DroppedPetal(x, y, petal_type, count)
+        self.drops[d] = None; self.grid.insert(d)
+        d.despawn = sim_clock.call_later(self.ttl, self.remove, d)
+        while len(self.drops) > self.cap: self.remove(next(iter(self.drops)))
+        return d
+    def remove(self, d):
+        if d in self.drops:
+            del self.drops[d]; self.grid.remove(d)
+            sim_clock.cancel(d.despawn); d.despawn = None
+    def pickup(self, x, y, reach):
+        """Remove and return every drop within `reach` of (x, y)."""
+        near = self.grid.query(x, y, reach); self.tests += len(near)
+        taken = [d for d in near if math.hypot(d.pos[0]-x, d.pos[1]-y) < reach]
+        for d in taken: self.remove(d)
+        return taken
+    def visible(self, x0, y0, x1, y1):
+        return self.grid.query_rect(x0, y0, x1, y1)
+    def clear(self):
+        self.drops.clear(); self.grid.clear()
+
+class BeeSwarm:
+    """Struct-of-arrays store for a bee population; `BeeMob` is a view onto one row. A `chunked`
+    swarm runs only the chunks near its focus at full rate (see set_focus)."""
+    def __init__(self, count, is_queen=False, spawn_margin=100, respawn_time=None, chunked=False):
         self.is_queen = is_queen
+        self.respawn_time = respawn_time if respawn_time is not None else (QUEEN_RESPAWN_TIME if is_queen else BEE_RESPAWN_TIME)
         self.radius = 75 if is_queen else 25
         self.max_health = 500 if is_queen else 100
-        self.health = self.max_health
-        self.pos = [x, y]
-        self.last_hit_time, self.is_aggressive, self.dropped_loot = 0, False, False
-        self.death_time = 0
-        self.last_missile_time = 0
-    def take_damage(self, amount):
-        self.health -= amount
-        self.last_hit_time, self.is_aggressive = time.time(), True
-        if self.health <= 0: self.death_time = time.time()
-    def respawn(self):
-        self.health = self.max_health
-        self.pos = [random.randint(-WORLD_SIZE+100, WORLD_SIZE-100), random.randint(-WORLD_SIZE+100, WORLD_SIZE-100)]
-        self.is_aggressive, self.dropped_loot, self.death_time = False, False, 0
-    def update(self, p_pos):
-        if self.health > 0:
-            speed = 3.2 if self.is_queen else 1.6
-            if self.is_aggressive:
-                dx, dy = p_pos[0] - self.pos[0], p_pos[1] - self.pos[1]
-                dist = math.hypot(dx, dy)
-                if dist > 0:
-                    self.pos[0] += (dx/dist) * speed
-                    self.pos[1] += (dy/dist) * speed
-            self.pos[0] = max(-WORLD_SIZE, min(WORLD_SIZE, self.pos[0]))
-            self.pos[1] = max(-WORLD_SIZE, min(WORLD_SIZE, self.pos[1]))
-    def draw(self, surface, cam_x, cam_y):
-        if self.health <= 0: return
-        sx, sy = int(self.pos[0]-cam_x), int(self.pos[1]-cam_y)
-        is_f = (time.time() - self.last_hit_time) < 0.1
-        pygame.draw.circle(surface, (255, 150, 150) if is_f else BEE_YELLOW, (sx, sy), self.radius)
-        pygame.draw.rect(surface, BEE_STRIPE, (sx-self.radius*0.4, sy-self.radius*0.7, self.radius*0.25, self.radius*1.4))
-        pygame.draw.rect(surface, BEE_STRIPE, (sx+self.radius*0.1, sy-self.radius*0.7, self.radius*0.25, self.radius*1.4))
-        if self.is_queen:
-            pygame.draw.polygon(surface, (255, 215, 0), [(sx-20, sy-self.radius), (sx-10, sy-self.radius-20), (sx, sy-self.radius), (sx+10, sy-self.radius-20), (sx+20, sy-self.radius)])
-        pygame.draw.circle(surface, (0, 0, 0), (sx, sy), self.radius, 2)
-        # Restore Bee Labels
-        name_txt = font_sm.render("Queen Bee" if self.is_queen else "Bee", True, (255, 255, 255))
-        surface.blit(name_txt, (sx - name_txt.get_width()//2, sy - self.radius - 35))
-        pygame.draw.rect(surface, (50, 0, 0), (sx-self.radius, sy-self.radius-15, self.radius*2, 8))
-        pygame.draw.rect(surface, (255, 50, 50), (sx-self.radius, sy-self.radius-15, int((max(0, self.health)/self.max_health)*(self.radius*2)), 8))
+        self.speed = 3.2 if is_queen else 1.6
+        lim = WORLD_SIZE - spawn_margin
+        self.pos = np.array([(random.randint(-lim, lim), random.randint(-lim, lim)) for _ in range(count)], dtype=float).reshape(count, 2)
+        self.prev_pos = self.pos.copy()  # Positions at the start of the current tick, for render interpolation
+        self.health = np.full(count, self.max_health, dtype=np.int64)
+        self.is_aggressive = np.zeros(count, dtype=bool)
+        self.dropped_loot = np.zeros(count, dtype=bool)
+        self.last_hit_time = np.zeros(count)
+        self.death_time = np.zeros(count)
+        self.missile_ready = np.ones(count, dtype=bool)
+        self._fallen = []  # Index arrays of bees killed since the last collect_dead()
+        self.bees = [BeeMob(self, i) for i in range(count)]
+        self._grid = None  # CellIndex over awake bees, rebuilt lazily after positions change
+        self.tests = 0
+        self.chunked, self._chunks = chunked, int(math.ceil(2 * WORLD_SIZE / CHUNK_SIZE)) + 1
+        self.chunk = self._chunk_of(self.pos)
+        self.awake, self._awake_idx = np.ones(count, dtype=bool), np.arange(count)
+        self._focus = self._wake_grid = self._reach = None  # Focus chunks, wake reach in chunks and the awake-chunk mask, from set_focus()
+        self._lod_ticks = 0
+    def __len__(self): return len(self.bees)
+    def __iter__(self): return iter(self.bees)
+    def __getitem__(self, i): return self.bees[i]
+
+    def _chunk_of(self, xy):
+        return np.clip((np.asarray(xy, dtype=float).reshape(-1, 2) + WORLD_SIZE) // CHUNK_SIZE, 0, self._chunks - 1).astype(np.int64)
+    def set_focus(self, points, reach=RADAR_RANGE):
+        """Wake the chunks within `reach` of `points` (one point or an (m, 2) array) and put
+        the rest to sleep. Cheap when the focus stays in the same chunks as last time."""
+        chunks = self._chunk_of(points)
+        focus = np.unique(chunks[:, 0] * self._chunks + chunks[:, 1])
+        reach = int(math.ceil(reach / CHUNK_SIZE))
+        if self._focus is not None and np.array_equal(focus, self._focus) and reach == self._reach: return
+        self._focus, self._reach = focus, reach
+        grid = np.zeros((self._chunks, self._chunks), dtype=bool)
+        for key in focus.tolist():
+            cx, cy = divmod(key, self._chunks)
+            grid[max(0, cx - reach):cx + reach + 1, max(0, cy - reach):cy + reach + 1] = True
+        self._wake_grid = grid
+        self._refresh_awake()
+    def _refresh_awake(self):
+        if not self.chunked or self._wake_grid is None: return
+        awake = self._wake_grid[self.chunk[:, 0], self.chunk[:, 1]]
+        woken = np.flatnonzero(awake & ~self.awake)
+        self.awake, self._awake_idx, self._grid = awake, np.flatnonzero(awake), None
+        if len(woken): self.prev_pos[woken] = self.pos[woken]
+
+    def snapshot(self):
+        rows = self._awake_idx
+        if len(rows) == len(self.pos): self.prev_pos[:] = self.pos
+        else: self.prev_pos[rows] = self.pos[rows]
+    def render_pos(self, idx, alpha):
+        return self.prev_pos[idx] + (self.pos[idx] - self.prev_pos[idx]) * alpha
+    def update(self, p_pos, idx=None):
+        """Move aggressive bees toward `p_pos`: one point, or an (n, 2) array of per-bee targets.
+        Without `idx` this is the swarm's tick: only awake bees are touched. Every CHUNK_LOD_INTERVAL
+        ticks a chunked swarm also gives dormant chasers their coarse step and re-sorts bees into
+        chunks, so a bee that wandered out of the awake area stays awake until then."""
+        target = np.asarray(p_pos, dtype=float)
+        if idx is None:
+            self._step(np.flatnonzero((self.health > 0) & self.is_aggressive & self.awake), target, self.speed)
+        else:
+            idx = np.atleast_1d(idx)
+            self._step(idx[(self.health[idx] > 0) & self.is_aggressive[idx]], target, self.speed)
+        if self.chunked and idx is None:
+            self._lod_ticks += 1
+            if self._lod_ticks % CHUNK_LOD_INTERVAL == 0:  # Keep in step with lod_due
+                sleepers = np.flatnonzero(~self.awake & (self.health > 0) & self.is_aggressive)
+                self._step(sleepers, target, self.speed * CHUNK_LOD_INTERVAL, settle=True)
+                self.prev_pos[sleepers] = self.pos[sleepers]
+                self.chunk = self._chunk_of(self.pos)
+                self._refresh_awake()
+    @property
+    def lod_due(self):
+        """Whether the next update() gives dormant chasers their coarse step, so callers computing
+        per-bee targets can skip dormant bees on every other tick."""
+        return self.chunked and (self._lod_ticks + 1) % CHUNK_LOD_INTERVAL == 0
+    def _step(self, rows, target, step, settle=False):
+        """Move `rows` `step` units toward their target; `settle` stops them on it instead of overshooting."""
+        if len(rows) == 0: return
+        d = (target[rows] if target.ndim == 2 else target[:2]) - self.pos[rows]
+        dist = np.hypot(d[:, 0], d[:, 1])
+        moving = dist > 0
+        stride = np.minimum(dist[moving], step) if settle else step
+        self.pos[rows[moving]] += d[moving] / dist[moving, None] * (stride[:, None] if settle else stride)
+        np.clip(self.pos, -WORLD_SIZE, WORLD_SIZE, out=self.pos)
+        self._grid = None
+    def take_damage(self, idx, amount):
+        """Apply `amount` (scalar or per-index) to rows `idx`; repeated indices take every hit."""
+        idx, now = np.atleast_1d(idx), sim_clock.now
+        np.subtract.at(self.health, idx, amount)
+        self.last_hit_time[idx], self.is_aggressive[idx] = now, True
+        dead = np.unique(idx[self.health[idx] <= 0])
+        if len(dead):
+            self.death_time[dead] = now
+            self._fallen.append(dead)
+            sim_clock.call_later(self.respawn_time, self.respawn, dead)
+    def respawn(self, idx):
+        idx, lim = np.atleast_1d(idx), WORLD_SIZE - 100
+        for i in idx: self.pos[i] = (random.randint(-lim, lim), random.randint(-lim, lim))
+        self.prev_pos[idx] = self.pos[idx]
+        self.health[idx] = self.max_health
+        self.is_aggressive[idx], self.dropped_loot[idx], self.death_time[idx] = False, False, 0
+        self._grid = None
+        self.chunk[idx] = self._chunk_of(self.pos[idx])
+        self._refresh_awake()
+    def reload(self, idx):
+        self.missile_ready[idx] = True
+    def collect_dead(self):
+        """Indices of bees that died since the last call; their loot is marked as dropped."""
+        if not self._fallen: return np.empty(0, dtype=np.int64)
+        idx = np.unique(np.concatenate(self._fallen)); self._fallen.clear()
+        idx = idx[(self.health[idx] <= 0) & ~self.dropped_loot[idx]]
+        self.dropped_loot[idx] = True
+        return idx
+
+    def draw(self, surface, cam_x, cam_y, alpha=1.0, idx=None):
+        """Blit the living bees in `idx` (default: those inside the surface's view) in one batch
+        from cached sprites. Only bees with a partly drained health bar still use pygame.draw."""
+        r = self.radius
+        if idx is None:
+            w, h = surface.get_size(); m = r + BEE_OVERHANG
+            idx = np.sort(self.query_rect(cam_x - m, cam_y - m, cam_x + w + m, cam_y + h + m))
+        idx = np.atleast_1d(idx); idx = idx[self.health[idx] > 0]
+        if len(idx) == 0: return
+        now = sim_clock.now
+        screen_xy = (self.render_pos(idx, alpha) - (cam_x, cam_y)).astype(int).tolist()
+        flashing = ((now - self.last_hit_time[idx]) < 0.1).tolist()
+        health = self.health[idx].tolist()
+        bodies = [sprite_cache.get(("bee", r, self.is_queen, f), build_bee_sprite, r, self.is_queen, f) for f in (False, True)]
+        label = text_cache.render(font_sm, "Queen Bee" if self.is_queen else "Bee", True, (255, 255, 255))
+        full_bar = sprite_cache.get(("health_bar", r * 2), build_health_bar_sprite, r * 2)[0]
+        lx, blits, drained = label.get_width() // 2, [], []
+        for (sx, sy), f, hp in zip(screen_xy, flashing, health):
+            body, (ax, ay) = bodies[f]
+            blits.append((body, (sx - ax, sy - ay))); blits.append((label, (sx - lx, sy - r - 35)))
+            if hp >= self.max_health: blits.append((full_bar, (sx - r, sy - r - 15)))
+            else: drained.append((sx, sy, hp))
+        surface.blits(blits, False)
+        for sx, sy, hp in drained:
+            pygame.draw.rect(surface, (50, 0, 0), (sx-r, sy-r-15, r*2, 8))
+            pygame.draw.rect(surface, (255, 50, 50), (sx-r, sy-r-15, int((max(0, hp)/self.max_health)*(r*2)), 8))
+
+    def query(self, x, y, radius):
+        """Candidate indices in grid cells overlapping the square around (x, y)."""
+        return self.query_rect(x - radius, y - radius, x + radius, y + radius)
+    def _index(self):
+        if self._grid is None:
+            rows = self._awake_idx
+            self._grid = CellIndex(self.pos, None if len(rows) == len(self.pos) else rows)
+        return self._grid
+    def query_rect(self, x0, y0, x1, y1):
+        """Candidate indices in grid cells overlapping the rectangle. Only awake bees are indexed,
+        so queries never reach into dormant chunks."""
+        return self._index().query_rect(x0, y0, x1, y1)
+    def hits(self, x, y, reach):
+        """Indices of living bees closer than `reach` to (x, y)."""
+        idx = self.query(x, y, reach); self.tests += len(idx)
+        if len(idx) == 0: return idx
+        d = np.hypot(self.pos[idx, 0] - x, self.pos[idx, 1] - y)
+        return idx[(self.health[idx] > 0) & (d < reach)]
+    def pairs(self, xy, reach):
+        """(point, bee) index pairs with a living bee closer than `reach`, for every point in the
+        (m, 2) array `xy`. The grid-column binary searches run for all points at once."""
+        xy = np.asarray(xy, dtype=float).reshape(-1, 2)
+        p, b = self._index().candidates(xy, reach); self.tests += len(b)
+        keep = (self.health[b] > 0) & (np.hypot(self.pos[b, 0] - xy[p, 0], self.pos[b, 1] - xy[p, 1]) < reach)
+        return p[keep], b[keep]
+    def push_from(self, idx, x, y, force):
+        """Summed knockback on a body at (x, y) from every bee in `idx`."""
+        d = np.array((x, y), dtype=float) - self.pos[idx]
+        dist = np.maximum(1, np.hypot(d[:, 0], d[:, 1]))
+        push = (d / dist[:, None]).sum(axis=0) * force
+        return float(push[0]), float(push[1])
+
+def _swarm_field(name):
+    return property(lambda self: getattr(self.swarm, name)[self.idx],
+                    lambda self, value: getattr(self.swarm, name).__setitem__(self.idx, value))
+
+class BeeMob:
+    """Single bee viewed through its owning BeeSwarm; reads and writes go straight to the arrays."""
+    __slots__ = ("swarm", "idx")
+    def __init__(self, swarm, idx):
+        self.swarm, self.idx = swarm, idx
+    is_queen = property(lambda self: self.swarm.is_queen)
+    radius = property(lambda self: self.swarm.radius)
+    max_health = property(lambda self: self.swarm.max_health)
+    pos = property(lambda self: self.swarm.pos[self.idx])
+    health, is_aggressive, dropped_loot = _swarm_field("health"), _swarm_field("is_aggressive"), _swarm_field("dropped_loot")
+    last_hit_time, death_time, missile_ready = _swarm_field("last_hit_time"), _swarm_field("death_time"), _swarm_field("missile_ready")
+    def take_damage(self, amount): self.swarm.take_damage(self.idx, amount)
+    def respawn(self): self.swarm.respawn(self.idx)
+    def reload(self): self.swarm.reload(self.idx)
+    def update(self, p_pos): self.swarm.update(p_pos, self.idx)
+    def draw(self, surface, cam_x, cam_y, alpha=1.0): self.swarm.draw(surface, cam_x, cam_y, alpha, self.idx)
 
 # --- PERSISTENT DATA ---
 p_lvl, p_xp, p_lvl_points = 1, 0, 0
-p_rotation_speed, p_petal_range = 0.04, 85
+p_rotation_speed, p_petal_range = PLAYER_ROTATION_SPEED, PLAYER_PETAL_RANGE
 hotbar = [Petal("Basic", BASIC_COLOR) for _ in range(5)]
 stored_petals = []
+inventory_index = {}  # Petal name -> its [Petal, count] entry in stored_petals
+inventory_version = 0  # Bumped on every stored_petals change; keys the cached inventory screen
 
 # --- TRANSIENT DATA ---
 player_w_pos = [0, 0]
 p_health, p_hit_time = 100, 0
-p_last_attack_time, p_last_regen_time = 0, 0  
-dropped_items, bees, queen_missiles = [], [], []
+regen_timer = None
+dropped_items, bees, queen_missiles = LootManager(), [], MissilePool()
 queen_bee = None
 orbit_angle, selected_for_swap_idx = 0, None
+inventory_scroll = 0  # First inventory row on screen
+prev_player_pos, prev_orbit_angle, angle_mouse = [0, 0], 0, 0
+sim_clock = SimClock()
+profiler = FrameProfiler(os.environ.get(PROFILE_ENV) or None)
+startup = StartupTimer(START_TIME)
 
-# UI Rects
-quit_btn_rect = pygame.Rect(20, 20, 100, 40)
-inv_btn_rect = pygame.Rect(20, HEIGHT - 110, 100, 30)
-buffs_btn_rect = pygame.Rect(20, HEIGHT - 150, 100, 30)
-respawn_btn_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 + 20, 200, 60)
+# UI Rects (laid out for the real screen size by init_display)
+quit_btn_rect = inv_btn_rect = buffs_btn_rect = respawn_btn_rect = None
+exit_btn_rect = speed_buff_rect = range_buff_rect = None
 
 # --- CORE FUNCTIONS ---
 
 def reset_game():
-    global p_health, player_w_pos, bees, queen_bee, dropped_items, current_state, orbit_angle, p_last_attack_time, p_last_regen_time, queen_missiles
-    p_health, player_w_pos, orbit_angle, p_last_attack_time, p_last_regen_time = 100, [0, 0], 0, 0, 0
-    dropped_items, queen_missiles = [], []
-    bees = [BeeMob(random.randint(-WORLD_SIZE+100, WORLD_SIZE-100), random.randint(-WORLD_SIZE+100, WORLD_SIZE-100)) for _ in range(BEE_COUNT)]
-    queen_bee = BeeMob(random.randint(-WORLD_SIZE+500, WORLD_SIZE-500), random.randint(-WORLD_SIZE+500, WORLD_SIZE-500), is_queen=True)
+    global p_health, player_w_pos, bees, queen_bee, current_state, orbit_angle
+    global prev_player_pos, prev_orbit_angle
+    p_health, player_w_pos, orbit_angle = PLAYER_MAX_HEALTH, [0, 0], 0
+    hold_regen()
+    prev_player_pos, prev_orbit_angle = [0, 0], 0
+    dropped_items.clear(); queen_missiles.clear()
+    bees = BeeSwarm(BEE_COUNT, chunked=True)
+    queen_bee = BeeSwarm(1, is_queen=True, spawn_margin=500)[0]
     current_state = STATE_GAME
 
+def hold_regen():
+    """(Re)start the regen countdown; called whenever the player attacks."""
+    global regen_timer
+    sim_clock.cancel(regen_timer)
+    regen_timer = sim_clock.call_later(REGEN_INTERVAL, regen_pulse)
+
+def regen_pulse():
+    global p_health, regen_timer
+    if current_state == STATE_GAME and p_health > 0: p_health = min(PLAYER_MAX_HEALTH, p_health + REGEN_AMOUNT)
+    regen_timer = sim_clock.call_later(REGEN_INTERVAL, regen_pulse)
+
+def xp_required(lvl):
+    return 100 + (lvl - 1) * 50
+
+def roll_bee_loot():
+    roll = random.random()
+    return "Glass" if roll < 0.09 else ("Basic" if roll < 0.54 else "Light")
+
+def drop_queen_loot(loot, x, y):
+    for dx, dy, petal_type in QUEEN_LOOT: loot.drop(x + dx, y + dy, petal_type)
+
 def add_xp(amount):
     global p_xp, p_lvl, p_lvl_points
     p_xp += amount
-    req = 100 + (p_lvl - 1) * 50
+    req = xp_required(p_lvl)
     if p_xp >= req: p_xp -= req; p_lvl += 1; p_lvl_points += 1
 
-def add_to_inventory(p_name, p_color, p_dmg, p_shape, p_cd):
-    for entry in stored_petals:
-        if entry[0].name == p_name: entry[1] += 1; return
-    stored_petals.append([Petal(p_name, p_color, p_dmg, p_shape, p_cd), 1])
+def add_to_inventory(p_name, p_color, p_dmg, p_shape, p_cd, count=1):
+    global inventory_version
+    inventory_version += 1
+    entry = inventory_index.get(p_name)
+    if entry is not None: entry[1] += count; return
+    entry = inventory_index[p_name] = [Petal(p_name, p_color, p_dmg, p_shape, p_cd), count]
+    stored_petals.append(entry)
+
+def take_from_inventory(idx):
+    """Remove one petal from stored_petals[idx] and return a fresh copy of it."""
+    global inventory_version
+    inventory_version += 1
+    entry = stored_petals[idx]; p = entry[0]
+    entry[1] -= 1
+    if entry[1] <= 0: stored_petals.pop(idx); del inventory_index[p.name]
+    return Petal(p.name, p.color, p.damage, p.shape, p.cooldown_time)
+
+def clear_inventory():
+    global inventory_version
+    inventory_version += 1
+    stored_petals.clear(); inventory_index.clear()
 
 # --- RENDERING HELPERS ---
 
+text_cache = TextCache()
+sprite_cache = SpriteCache()
 
+def build_grid_background(width, height, spacing=100):
+    """Map-green canvas one grid cell larger than the screen; blitting it at a sub-cell offset
+    scrolls the grid without redrawing any lines."""
+    surf = pygame.Surface((width + spacing, height + spacing)); surf.fill(MAP_GREEN)
+    for x in range(0, width + spacing + 1, spacing): pygame.draw.line(surf, GRID_COLOR, (x, 0), (x, height + spacing))
+    for y in range(0, height + spacing + 1, spacing): pygame.draw.line(surf, GRID_COLOR, (0, y), (width + spacing, y))
+    return surf, (0, 0)
 
-def draw_player_hud_restored(surface, px, py, angle, health, hit_time, lvl):
-    is_f = (time.time() - hit_time) < 0.1
-    pygame.draw.circle(surface, (255, 100, 100) if is_f else PLAYER_COLOR, (px, py), 25)
-    pygame.draw.circle(surface, (0, 0, 0), (px, py), 25, 2)
-    # Restore Face
+def build_bee_sprite(radius, is_queen, flash):
+    crown = 20 if is_queen else 0
+    surf = pygame.Surface((radius*2 + 2, radius*2 + 2 + crown), pygame.SRCALPHA)
+    cx, cy = radius + 1, radius + 1 + crown
+    pygame.draw.circle(surf, (255, 150, 150) if flash else BEE_YELLOW, (cx, cy), radius)
+    pygame.draw.rect(surf, BEE_STRIPE, (cx-radius*0.4, cy-radius*0.7, radius*0.25, radius*1.4))
+    pygame.draw.rect(surf, BEE_STRIPE, (cx+radius*0.1, cy-radius*0.7, radius*0.25, radius*1.4))
+    if is_queen:
+        pygame.draw.polygon(surf, (255, 215, 0), [(cx-20, cy-radius), (cx-10, cy-radius-20), (cx, cy-radius), (cx+10, cy-radius-20), (cx+20, cy-radius)])
+    pygame.draw.circle(surf, (0, 0, 0), (cx, cy), radius, 2)
+    return surf, (cx, cy)
+
+def build_health_bar_sprite(width, color=(255, 50, 50)):
+    surf = pygame.Surface((width, 8)); surf.fill(color)
+    return surf, (0, 0)
+
+def build_missile_sprite(angle):
+    surf, c = pygame.Surface((32, 32), pygame.SRCALPHA), 16
+    pts = [(c + math.cos(angle)*15, c + math.sin(angle)*15), (c + math.cos(angle + 2.5)*10, c + math.sin(angle + 2.5)*10), (c + math.cos(angle - 2.5)*10, c + math.sin(angle - 2.5)*10)]
+    pygame.draw.polygon(surf, (255, 50, 50), pts)
+    pygame.draw.polygon(surf, (255, 255, 255), pts, 1)
+    return surf, (c, c)
+
+def build_loot_sprite(shape, color, radius):
+    surf, c = pygame.Surface((radius*2 + 2, radius*2 + 2), pygame.SRCALPHA), radius + 1
+    if shape == "square":
+        pygame.draw.rect(surf, color, (c-10, c-10, 20, 20))
+        pygame.draw.rect(surf, (255, 255, 255), (c-10, c-10, 20, 20), 2)
+    else:
+        pygame.draw.circle(surf, color, (c, c), radius)
+        pygame.draw.circle(surf, (255, 255, 255), (c, c), radius, 2)
+    return surf, (c, c)
+
+def build_petal_sprite(shape, color, size):
+    surf = pygame.Surface((size, size), pygame.SRCALPHA)
+    if shape == "square": surf.fill(color)
+    else: pygame.draw.circle(surf, color, (size//2, size//2), size//2)
+    return surf, (size//2, size//2)
+
+def build_hotbar_slot_sprite(shape, color):
+    surf = pygame.Surface((50, 50), pygame.SRCALPHA)
+    pygame.draw.rect(surf, (50, 50, 50), (0, 0, 50, 50), border_radius=8)
+    if shape == "square": pygame.draw.rect(surf, color, (15, 12, 20, 20))
+    else: pygame.draw.circle(surf, color, (25, 22), 10)
+    return surf, (0, 0)
+
+def build_cooldown_overlay_sprite():
+    surf = pygame.Surface((50, 50), pygame.SRCALPHA); surf.fill(COOLDOWN_OVERLAY)
+    return surf, (0, 0)
+
+def build_player_body_sprite(flash):
+    surf = pygame.Surface((52, 52), pygame.SRCALPHA)
+    pygame.draw.circle(surf, (255, 100, 100) if flash else PLAYER_COLOR, (26, 26), 25)
+    pygame.draw.circle(surf, (0, 0, 0), (26, 26), 25, 2)
+    return surf, (26, 26)
+
+def build_player_face_sprite(angle):
+    surf, c = pygame.Surface((52, 52), pygame.SRCALPHA), 26
+    eye_surf = pygame.Surface((10, 14), pygame.SRCALPHA)
+    pygame.draw.ellipse(eye_surf, EYE_WHITE, (0, 0, 10, 14))
+    rot_eye = pygame.transform.rotate(eye_surf, -math.degrees(angle) - 90)
     for side in [-1, 1]:
         sa = angle + (side * 0.55)
-        sx, sy = px + math.cos(sa)*12, py + math.sin(sa)*12
-        eye_surf = pygame.Surface((10, 14), pygame.SRCALPHA)
-        pygame.draw.ellipse(eye_surf, EYE_WHITE, (0, 0, 10, 14))
-        rot_eye = pygame.transform.rotate(eye_surf, -math.degrees(angle) - 90)
-        surface.blit(rot_eye, rot_eye.get_rect(center=(int(sx), int(sy))))
-        pygame.draw.circle(surface, EYE_BLACK, (int(sx+math.cos(angle)*3), int(sy+math.sin(angle)*3)), 3)
-    pygame.draw.arc(surface, EYE_BLACK, (px-9, py-9, 18, 18), -angle-0.8, -angle+0.8, 3)
+        sx, sy = c + math.cos(sa)*12, c + math.sin(sa)*12
+        surf.blit(rot_eye, rot_eye.get_rect(center=(int(sx), int(sy))))
+        pygame.draw.circle(surf, EYE_BLACK, (int(sx+math.cos(angle)*3), int(sy+math.sin(angle)*3)), 3)
+    pygame.draw.arc(surf, EYE_BLACK, (c-9, c-9, 18, 18), -angle-0.8, -angle+0.8, 3)
+    return surf, (c, c)
+
+def draw_player_hud_restored(surface, px, py, angle, health, hit_time, lvl):
+    is_f = (sim_clock.now - hit_time) < 0.1
+    body, (bx, by) = sprite_cache.get(("player", is_f), build_player_body_sprite, is_f)
+    # Restore Face
+    face, (fx, fy) = sprite_cache.rotated(("player_face",), angle, build_player_face_sprite)
+    surface.blits(((body, (px - bx, py - by)), (face, (px - fx, py - fy))), False)
     # Restore HUD labels
     pygame.draw.rect(surface, (50, 0, 0), (px-30, py+35, 60, 8))
     pygame.draw.rect(surface, (50, 255, 50), (px-30, py+35, int((max(0,health)/100)*60), 8))
-    lvl_txt = font_sm.render(f"Lvl: {lvl}", True, (255, 255, 255))
+    lvl_txt = text_cache.render(font_sm, f"Lvl: {lvl}", True, (255, 255, 255))
     surface.blit(lvl_txt, (px - lvl_txt.get_width()//2, py + 45))
 
 def draw_minimap(surface, p_pos, bees, queen):
@@ -214,10 +867,11 @@ def draw_minimap(surface, p_pos, bees, queen):
     scale, cx, cy = map_w / RADAR_RANGE, map_w / 2, map_h / 2
     ox, oy = cx - (p_pos[0] * scale), cy - (p_pos[1] * scale)
     pygame.draw.rect(radar_surf, (255, 255, 255), (ox-(WORLD_SIZE*scale), oy-(WORLD_SIZE*scale), (WORLD_SIZE*2)*scale, (WORLD_SIZE*2)*scale), 1)
-    for b in bees:
-        if b.health > 0:
-            bx, by = cx + (b.pos[0]-p_pos[0])*scale, cy + (b.pos[1]-p_pos[1])*scale
-            if 0 < bx < map_w and 0 < by < map_h: pygame.draw.circle(radar_surf, (255, 50, 50), (int(bx), int(by)), 2)
+    half = map_w / 2 / scale
+    near = bees.query_rect(p_pos[0] - half, p_pos[1] - half, p_pos[0] + half, p_pos[1] + half)
+    bxy = (bees.pos[near[bees.health[near] > 0]] - np.array(p_pos[:2], dtype=float)) * scale + (cx, cy)
+    for bx, by in bxy[(bxy[:, 0] > 0) & (bxy[:, 0] < map_w) & (bxy[:, 1] > 0) & (bxy[:, 1] < map_h)].astype(int).tolist():
+        pygame.draw.circle(radar_surf, (255, 50, 50), (bx, by), 2)
     if queen and queen.health > 0:
         qx, qy = cx + (queen.pos[0]-p_pos[0])*scale, cy + (queen.pos[1]-p_pos[1])*scale
         if 0 < qx < map_w and 0 < qy < map_h: pygame.draw.circle(radar_surf, (255, 215, 0), (int(qx), int(qy)), 4)
@@ -227,167 +881,380 @@ def draw_minimap(surface, p_pos, bees, queen):
 
 def draw_xp_tracker(surface, lvl, xp):
     map_w, map_x, tracker_y = 180, WIDTH - 180 - 30, 225
-    req = 100 + (lvl - 1) * 50
+    req = xp_required(lvl)
     pygame.draw.rect(surface, (40, 40, 40, 180), (map_x, tracker_y, map_w, 50))
     pygame.draw.rect(surface, (100, 100, 100), (map_x, tracker_y, map_w, 50), 2)
-    surface.blit(font_sm.render(f"LEVEL {lvl}", True, (255, 255, 255)), (map_x + 10, tracker_y + 8))
-    xp_txt = font_sm.render(f"{xp} / {req} XP", True, (200, 200, 200))
+    surface.blit(text_cache.render(font_sm, f"LEVEL {lvl}", True, (255, 255, 255)), (map_x + 10, tracker_y + 8))
+    xp_txt = text_cache.render(font_sm, f"{xp} / {req} XP", True, (200, 200, 200))
     surface.blit(xp_txt, (map_x + map_w - xp_txt.get_width() - 10, tracker_y + 8))
     pygame.draw.rect(surface, (20, 20, 20), (map_x + 10, tracker_y + 28, map_w - 20, 10))
     pygame.draw.rect(surface, (0, 255, 100), (map_x + 10, tracker_y + 28, int((xp/req)*(map_w-20)), 10))
 
-# --- MAIN LOOP ---
-reset_game()
-running = True
-while running:
-    mx, my = pygame.mouse.get_pos()
-    for event in pygame.event.get():
-        if event.type == pygame.QUIT: running = False
-        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: running = False 
-        if event.type == pygame.MOUSEBUTTONDOWN:
-            if quit_btn_rect.collidepoint(mx, my): running = False
+def inventory_rows_visible():
+    return max(1, (HEIGHT - 190) // INVENTORY_CELL)
+
+def scroll_inventory(rows):
+    """Move the inventory view by `rows`, clamped so the last row can reach the bottom of the view."""
+    global inventory_scroll
+    total = -(-len(stored_petals) // INVENTORY_COLS)
+    inventory_scroll = max(0, min(inventory_scroll + rows, total - inventory_rows_visible()))
+
+def inventory_slot_at(mx, my):
+    """Index into stored_petals of the slot under (mx, my), or None."""
+    col, cx = divmod(mx - 150, INVENTORY_CELL)
+    row, cy = divmod(my - 150, INVENTORY_CELL)
+    if not (0 <= col < INVENTORY_COLS and 0 <= row < inventory_rows_visible() and cx < 90 and cy < 90): return None
+    idx = (inventory_scroll + row) * INVENTORY_COLS + col
+    return idx if idx < len(stored_petals) else None
+
+def build_inventory_screen(width, height, first_row):
+    """The inventory screen from row `first_row` on. Only the rows in view are drawn, so the cost
+    does not grow with the number of petal types."""
+    surf = pygame.Surface((width, height)); surf.fill((20, 20, 20))
+    pygame.draw.rect(surf, (150, 50, 50), exit_btn_rect, border_radius=8)
+    surf.blit(text_cache.render(font_md, "EXIT", True, (255, 255, 255)), (width-115, 42))
+    rows, start = inventory_rows_visible(), first_row * INVENTORY_COLS
+    for i, entry in enumerate(stored_petals[start:start + rows * INVENTORY_COLS]):
+        ix, iy = 150 + (i % INVENTORY_COLS) * INVENTORY_CELL, 150 + (i // INVENTORY_COLS) * INVENTORY_CELL
+        pygame.draw.rect(surf, (60, 60, 60), (ix, iy, 90, 90), border_radius=10)
+        if entry[0].shape == "square": pygame.draw.rect(surf, entry[0].color, (ix+25, iy+15, 40, 40))
+        else: pygame.draw.circle(surf, entry[0].color, (ix+45, iy+35), 25)
+        surf.blit(text_cache.render(font_sm, f"{entry[1]}x {entry[0].name}", True, (255, 255, 255)), (ix+5, iy+70))
+    total = -(-len(stored_petals) // INVENTORY_COLS)
+    if total > rows:
+        caption = f"Rows {first_row + 1}-{min(total, first_row + rows)} of {total}  (wheel / PgUp / PgDn)"
+        surf.blit(text_cache.render(font_sm, caption, True, (200, 200, 200)), (150, 120))
+    return surf
+
+def build_buffs_screen(width, height, points):
+    surf = pygame.Surface((width, height)); surf.fill((20, 25, 30))
+    pygame.draw.rect(surf, (150, 50, 50), exit_btn_rect, border_radius=8)
+    surf.blit(text_cache.render(font_md, "EXIT", True, (255, 255, 255)), (width-115, 42))
+    surf.blit(text_cache.render(font_md, f"BUFFS - Points: {points}", True, (255, 255, 255)), (width//2-80, 50))
+    pygame.draw.ellipse(surf, (0, 200, 100) if points >= 1 else (80, 80, 80), speed_buff_rect)
+    surf.blit(text_cache.render(font_sm, "Speed +1", True, (255, 255, 255)), (speed_buff_rect.centerx-30, speed_buff_rect.centery-5))
+    pygame.draw.ellipse(surf, (0, 150, 255) if points >= 2 else (80, 80, 80), range_buff_rect)
+    surf.blit(text_cache.render(font_sm, "Range +1", True, (255, 255, 255)), (range_buff_rect.centerx-30, range_buff_rect.centery-5))
+    return surf
+
+menu_screens = {}  # Screen name -> (key, surface)
+
+def cached_menu(name, key, build, *args):
+    """Full-screen surface for menu `name`, rebuilt only when `key` differs from last time."""
+    entry = menu_screens.get(name)
+    if entry is None or entry[0] != key: entry = menu_screens[name] = (key, build(*args))
+    return entry[1]
+
+# --- SIMULATION ---
+
+def snapshot_positions():
+    """Remember where everything was at the start of the tick so rendering can interpolate."""
+    global prev_player_pos, prev_orbit_angle
+    prev_player_pos, prev_orbit_angle = list(player_w_pos), orbit_angle
+    bees.snapshot(); queen_bee.swarm.snapshot(); queen_missiles.snapshot()
+
+def step_game(mx, my):
+    """Advance gameplay by one fixed SIM_DT tick."""
+    global p_health, p_hit_time, current_state, orbit_angle, angle_mouse
+    now = sim_clock.now
+    if p_health <= 0: current_state = STATE_DEAD; return
+
+    cam_x, cam_y = player_w_pos[0]-WIDTH//2, player_w_pos[1]-HEIGHT//2
+    player_w_pos[0] += (mx + cam_x - player_w_pos[0]) * PLAYER_EASE
+    player_w_pos[1] += (my + cam_y - player_w_pos[1]) * PLAYER_EASE
+    player_w_pos[0], player_w_pos[1] = max(-WORLD_SIZE, min(WORLD_SIZE, player_w_pos[0])), max(-WORLD_SIZE, min(WORLD_SIZE, player_w_pos[1]))
+    profiler.lap("player")
+
+    # Missiles
+    queen_missiles.update()
+    struck_by = queen_missiles.hits(player_w_pos[0], player_w_pos[1], MISSILE_HIT_REACH)
+    if len(struck_by):
+        p_health -= int(queen_missiles.damage[struck_by].sum()); p_hit_time = now
+        queen_missiles.kill(struck_by)
+    profiler.count("missiles_processed", len(queen_missiles)); profiler.lap("missiles")
+
+    # Queen
+    if queen_bee.health <= 0:
+        if not queen_bee.dropped_loot:
+            add_xp(QUEEN_XP)
+            drop_queen_loot(dropped_items, float(queen_bee.pos[0]), float(queen_bee.pos[1]))
+            queen_bee.dropped_loot = True
+    else:
+        queen_bee.update(player_w_pos)
+        dq = math.hypot(player_w_pos[0]-queen_bee.pos[0], player_w_pos[1]-queen_bee.pos[1])
+        if dq < MISSILE_RANGE and queen_bee.missile_ready:
+            queen_missiles.fire(queen_bee.pos[0], queen_bee.pos[1], player_w_pos)
+            queen_bee.missile_ready = False; sim_clock.call_later(MISSILE_RELOAD_TIME, queen_bee.reload)
+        if dq < QUEEN_CONTACT_REACH:
+            player_w_pos[0] += ((player_w_pos[0]-queen_bee.pos[0])/max(1,dq))*QUEEN_KNOCKBACK
+            player_w_pos[1] += ((player_w_pos[1]-queen_bee.pos[1])/max(1,dq))*QUEEN_KNOCKBACK
+            if now-p_hit_time > HIT_COOLDOWN: p_health -= QUEEN_CONTACT_DAMAGE; p_hit_time = now
+    profiler.lap("queen")
+
+    for i in bees.collect_dead().tolist():
+        add_xp(BEE_XP)
+        dropped_items.drop(float(bees.pos[i, 0]), float(bees.pos[i, 1]), roll_bee_loot())
+    bees.set_focus(player_w_pos, max(RADAR_RANGE, max(WIDTH, HEIGHT) // 2 + bees.radius + BEE_OVERHANG))  # Nothing on screen sleeps
+    bees.update(player_w_pos)
+    touching = bees.hits(player_w_pos[0], player_w_pos[1], BEE_CONTACT_REACH)
+    if len(touching):
+        kx, ky = bees.push_from(touching, player_w_pos[0], player_w_pos[1], BEE_KNOCKBACK)
+        player_w_pos[0] += kx; player_w_pos[1] += ky
+        if now-p_hit_time > HIT_COOLDOWN: p_health -= BEE_CONTACT_DAMAGE; p_hit_time = now
+    profiler.count("bees_processed", len(bees._awake_idx)); profiler.lap("bees")
+
+    for d in dropped_items.pickup(player_w_pos[0], player_w_pos[1], LOOT_PICKUP_REACH):
+        add_to_inventory(d.type, d.color, d.dmg, d.shape, d.cd, d.count)
+    profiler.count("loot_processed", len(dropped_items)); profiler.lap("loot")
+
+    orbit_angle += p_rotation_speed
+    angle_mouse = math.atan2(my-HEIGHT//2, mx-WIDTH//2)
+    for i, p in enumerate(hotbar):
+        if p.is_active:
+            px_w, py_w = player_w_pos[0]+p_petal_range*math.cos(orbit_angle+(2*math.pi/5)*i), player_w_pos[1]+p_petal_range*math.sin(orbit_angle+(2*math.pi/5)*i)
+            if queen_bee.health > 0 and math.hypot(px_w-queen_bee.pos[0], py_w-queen_bee.pos[1]) < PETAL_QUEEN_REACH:
+                queen_bee.take_damage(p.damage); p.trigger_cooldown(); hold_regen()
+            struck = bees.hits(px_w, py_w, PETAL_BEE_REACH)
+            if len(struck): bees.take_damage(struck, p.damage); p.trigger_cooldown(); hold_regen()
+    profiler.lap("petals")
+
+def advance(ticks, mx, my):
+    """Run `ticks` simulation steps back to back, after the clock's pause and time_scale. Nothing
+    here waits on the display, so callers without a window can drive it faster than real time."""
+    for _ in range(sim_clock.scaled(ticks)):
+        snapshot_positions()
+        if current_state == STATE_GAME: step_game(mx, my)
+        sim_clock.tick()
+        profiler.lap("timers")
+
+# --- INPUT ---
+
+class LiveInput:
+    """Mouse state and events straight from pygame; ticks come from the real-time accumulator."""
+    def poll(self):
+        return pygame.mouse.get_pos(), pygame.event.get()
+    def ticks(self, due):
+        return due
+
+def _event_to_dict(event):
+    d = {"type": event.type}
+    for attr in ("key", "button", "pos", "y"):
+        if hasattr(event, attr): d[attr] = list(event.pos) if attr == "pos" else getattr(event, attr)
+    return d
+
+class InputRecorder:
+    """Wraps another source and keeps every frame's mouse state, events and tick count."""
+    def __init__(self, source):
+        self.source, self.frames = source, []
+    def poll(self):
+        pos, events = self.source.poll()
+        self.frames.append({"pos": list(pos), "events": [_event_to_dict(e) for e in events], "ticks": 0})
+        return pos, events
+    def ticks(self, due):
+        self.frames[-1]["ticks"] = due = self.source.ticks(due)
+        return due
+    def save(self, path):
+        with open(path, "w") as f: json.dump({"size": [WIDTH, HEIGHT], "time_scale": sim_clock.time_scale, "frames": self.frames}, f)
+
+class ScriptedInput:
+    """Deterministic input: `script(frame)` returns (pos, events) and each frame runs
+    exactly `ticks_per_frame` simulation ticks. A QUIT is sent once the script returns None."""
+    def __init__(self, script, ticks_per_frame=1):
+        self.script, self.ticks_per_frame, self.frame = script, ticks_per_frame, 0
+    def poll(self):
+        step = self.script(self.frame); self.frame += 1
+        return step if step is not None else ((WIDTH//2, HEIGHT//2), [pygame.event.Event(pygame.QUIT)])
+    def ticks(self, due):
+        return self.ticks_per_frame
+
+def replay_input(path):
+    """ScriptedInput that plays back a file written by InputRecorder, tick counts and time scale included."""
+    with open(path) as f: data = json.load(f)
+    frames = data["frames"]
+    def script(i):
+        if i >= len(frames): return None
+        fr = frames[i]
+        events = [pygame.event.Event(e["type"], {k: (tuple(v) if k == "pos" else v) for k, v in e.items() if k != "type"}) for e in fr["events"]]
+        return tuple(fr["pos"]), events
+    source = ScriptedInput(script)
+    source.ticks = lambda due: frames[source.frame - 1]["ticks"]
+    source.time_scale = data.get("time_scale", 1.0)
+    return source
+
+# --- FRAME ---
+
+def handle_events(events, mx, my):
+    """Apply one frame of input events. Returns False once the player asks to quit."""
+    global current_state, selected_for_swap_idx, p_rotation_speed, p_petal_range, p_lvl_points
+    keep_running = True
+    for event in events:
+        if event.type == pygame.QUIT: keep_running = False
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_ESCAPE: keep_running = False 
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_F3: profiler.toggle_overlay()
+        if event.type == pygame.KEYDOWN and event.key == pygame.K_p: sim_clock.paused = not sim_clock.paused
+        if current_state == STATE_INVENTORY:
+            if event.type == pygame.MOUSEWHEEL: scroll_inventory(-event.y)
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_PAGEUP: scroll_inventory(-inventory_rows_visible())
+            if event.type == pygame.KEYDOWN and event.key == pygame.K_PAGEDOWN: scroll_inventory(inventory_rows_visible())
+        if event.type == pygame.MOUSEBUTTONDOWN and event.button not in (pygame.BUTTON_WHEELUP, pygame.BUTTON_WHEELDOWN):
+            if quit_btn_rect.collidepoint(mx, my): keep_running = False
             if current_state == STATE_GAME:
-                if inv_btn_rect.collidepoint(mx, my): current_state = STATE_INVENTORY
+                if inv_btn_rect.collidepoint(mx, my): current_state = STATE_INVENTORY; scroll_inventory(0)
                 elif buffs_btn_rect.collidepoint(mx, my): current_state = STATE_BUFFS
                 elif selected_for_swap_idx is not None:
                     for i in range(5):
                         if pygame.Rect(20+(i*60), HEIGHT-70, 50, 50).collidepoint(mx, my):
                             old_p = hotbar[i]; add_to_inventory(old_p.name, old_p.color, old_p.damage, old_p.shape, old_p.cooldown_time)
-                            entry = stored_petals[selected_for_swap_idx]
-                            hotbar[i] = Petal(entry[0].name, entry[0].color, entry[0].damage, entry[0].shape, entry[0].cooldown_time)
-                            entry[1] -= 1
-                            if entry[1] <= 0: stored_petals.pop(selected_for_swap_idx)
+                            hotbar[i] = take_from_inventory(selected_for_swap_idx)
                             selected_for_swap_idx = None
+            elif current_state == STATE_INVENTORY:
+                slot = inventory_slot_at(mx, my)
+                if exit_btn_rect.collidepoint(mx, my): current_state = STATE_GAME
+                elif slot is not None: selected_for_swap_idx = slot; current_state = STATE_GAME
+            elif current_state == STATE_BUFFS:
+                if exit_btn_rect.collidepoint(mx, my): current_state = STATE_GAME
+                elif speed_buff_rect.collidepoint(mx, my) and p_lvl_points >= 1: p_rotation_speed += 0.015; p_lvl_points -= 1
+                elif range_buff_rect.collidepoint(mx, my) and p_lvl_points >= 2: p_petal_range += 20; p_lvl_points -= 2
             elif current_state == STATE_DEAD and respawn_btn_rect.collidepoint(mx, my): reset_game()
+    return keep_running
 
-    if current_state == STATE_GAME:
-        if p_health <= 0: current_state = STATE_DEAD; continue
-        if time.time() - p_last_attack_time > 2.0 and time.time() - p_last_regen_time > 2.0:
-            p_health = min(100, p_health + 2); p_last_regen_time = time.time()
-        
-        cam_x, cam_y = player_w_pos[0]-WIDTH//2, player_w_pos[1]-HEIGHT//2
-        player_w_pos[0] += (mx + cam_x - player_w_pos[0]) * 0.025
-        player_w_pos[1] += (my + cam_y - player_w_pos[1]) * 0.025
-        player_w_pos[0], player_w_pos[1] = max(-WORLD_SIZE, min(WORLD_SIZE, player_w_pos[0])), max(-WORLD_SIZE, min(WORLD_SIZE, player_w_pos[1]))
-        
-        # Missiles
-        for m in queen_missiles[:]:
-            m.update()
-            if math.hypot(player_w_pos[0]-m.pos[0], player_w_pos[1]-m.pos[1]) < 30:
-                p_health -= m.damage; m.alive = False; p_hit_time = time.time()
-            if not m.alive: queen_missiles.remove(m)
-
-        # Queen
-        if queen_bee.health <= 0:
-            if not queen_bee.dropped_loot:
-                add_xp(250)
-                dropped_items.extend([DroppedPetal(queen_bee.pos[0]-30, queen_bee.pos[1], "Glass"), DroppedPetal(queen_bee.pos[0]+30, queen_bee.pos[1], "Glass"), DroppedPetal(queen_bee.pos[0], queen_bee.pos[1]+30, "Stinger")])
-                queen_bee.dropped_loot = True
-            if time.time() - queen_bee.death_time >= QUEEN_RESPAWN_TIME: queen_bee.respawn()
-        else:
-            queen_bee.update(player_w_pos)
-            dq = math.hypot(player_w_pos[0]-queen_bee.pos[0], player_w_pos[1]-queen_bee.pos[1])
-            if dq < MISSILE_RANGE and time.time() - queen_bee.last_missile_time > 2.0:
-                queen_missiles.append(QueenMissile(queen_bee.pos[0], queen_bee.pos[1], player_w_pos)); queen_bee.last_missile_time = time.time()
-            if dq < 100:
-                player_w_pos[0] += ((player_w_pos[0]-queen_bee.pos[0])/max(1,dq))*60
-                player_w_pos[1] += ((player_w_pos[1]-queen_bee.pos[1])/max(1,dq))*60
-                if time.time()-p_hit_time > 0.3: p_health -= 30; p_hit_time = time.time()
-
-        for bee in bees:
-            if bee.health <= 0:
-                if not bee.dropped_loot:
-                    add_xp(25); roll = random.random()
-                    loot = "Glass" if roll < 0.09 else ("Basic" if roll < 0.54 else "Light")
-                    dropped_items.append(DroppedPetal(bee.pos[0], bee.pos[1], loot)); bee.dropped_loot = True
-                if time.time() - bee.death_time >= BEE_RESPAWN_TIME: bee.respawn()
-                continue
-            bee.update(player_w_pos)
-            db = math.hypot(player_w_pos[0]-bee.pos[0], player_w_pos[1]-bee.pos[1])
-            if db < 50:
-                player_w_pos[0] += ((player_w_pos[0]-bee.pos[0])/max(1,db))*45; player_w_pos[1] += ((player_w_pos[1]-bee.pos[1])/max(1,db))*45
-                if time.time()-p_hit_time > 0.3: p_health -= 15; p_hit_time = time.time()
-
-        for d in dropped_items[:]:
-            if math.hypot(player_w_pos[0]-d.pos[0], player_w_pos[1]-d.pos[1]) < 35:
-                add_to_inventory(d.type, d.color, d.dmg, d.shape, d.cd); dropped_items.remove(d)
-
-        orbit_angle += p_rotation_speed
-        angle_mouse = math.atan2(my-HEIGHT//2, mx-WIDTH//2)
-        for i, p in enumerate(hotbar):
-            p.update()
-            if p.is_active:
-                px_w, py_w = player_w_pos[0]+p_petal_range*math.cos(orbit_angle+(2*math.pi/5)*i), player_w_pos[1]+p_petal_range*math.sin(orbit_angle+(2*math.pi/5)*i)
-                if queen_bee.health > 0 and math.hypot(px_w-queen_bee.pos[0], py_w-queen_bee.pos[1]) < 85:
-                    queen_bee.take_damage(p.damage); p.trigger_cooldown(); p_last_attack_time = time.time()
-                for bee in bees:
-                    if bee.health > 0 and math.hypot(px_w-bee.pos[0], py_w-bee.pos[1]) < 37:
-                        bee.take_damage(p.damage); p.trigger_cooldown(); p_last_attack_time = time.time()
-
-    # RENDERING
-    screen.fill(MAP_GREEN)
-    cam_x, cam_y = player_w_pos[0]-WIDTH//2, player_w_pos[1]-HEIGHT//2
-    for x in range(int(cam_x//100)*100, int(cam_x+WIDTH)+100, 100): pygame.draw.line(screen, GRID_COLOR, (x-cam_x, 0), (x-cam_x, HEIGHT))
-    for y in range(int(cam_y//100)*100, int(cam_y+HEIGHT)+100, 100): pygame.draw.line(screen, GRID_COLOR, (0, y-cam_y), (WIDTH, y-cam_y))
+def render_frame(alpha, mx, my):
+    """Draw the world, HUD and any open screen into `screen`, interpolated `alpha` of the way
+    into the current tick. The inventory and buffs screens cover the world, so while one is
+    open only its cached surface is drawn."""
+    if current_state == STATE_INVENTORY:
+        key = (inventory_version, inventory_scroll, WIDTH, HEIGHT)
+        screen.blit(cached_menu("inventory", key, build_inventory_screen, WIDTH, HEIGHT, inventory_scroll), (0, 0)); return
+    if current_state == STATE_BUFFS:
+        screen.blit(cached_menu("buffs", (p_lvl_points, WIDTH, HEIGHT), build_buffs_screen, WIDTH, HEIGHT, p_lvl_points), (0, 0)); return
+    rp_x = prev_player_pos[0] + (player_w_pos[0] - prev_player_pos[0]) * alpha
+    rp_y = prev_player_pos[1] + (player_w_pos[1] - prev_player_pos[1]) * alpha
+    r_orbit = prev_orbit_angle + (orbit_angle - prev_orbit_angle) * alpha
+    cam_x, cam_y = rp_x-WIDTH//2, rp_y-HEIGHT//2
+    screen.blit(sprite_cache.get(("grid", WIDTH, HEIGHT), build_grid_background, WIDTH, HEIGHT)[0], (-int(cam_x % 100), -int(cam_y % 100)))
     pygame.draw.rect(screen, (200, 200, 200), (-WORLD_SIZE-cam_x, -WORLD_SIZE-cam_y, WORLD_SIZE*2, WORLD_SIZE*2), 5)
-    for d in dropped_items: d.draw(screen, cam_x, cam_y)
-    for bee in bees: bee.draw(screen, cam_x, cam_y)
-    queen_bee.draw(screen, cam_x, cam_y)
-    for m in queen_missiles: m.draw(screen, cam_x, cam_y)
+    for d in dropped_items.visible(cam_x-40, cam_y-30, cam_x+WIDTH+40, cam_y+HEIGHT+15): d.draw(screen, cam_x, cam_y)
+    bees.draw(screen, cam_x, cam_y, alpha)
+    queen_bee.draw(screen, cam_x, cam_y, alpha)
+    queen_missiles.draw(screen, cam_x, cam_y, alpha)
+    petal_blits = []
     for i, p in enumerate(hotbar):
         if p.is_active:
-            px_w, py_w = player_w_pos[0]+p_petal_range*math.cos(orbit_angle+(2*math.pi/5)*i), player_w_pos[1]+p_petal_range*math.sin(orbit_angle+(2*math.pi/5)*i)
-            if p.shape == "square": pygame.draw.rect(screen, p.color, (int(px_w-cam_x-12), int(py_w-cam_y-12), 24, 24))
-            else: pygame.draw.circle(screen, p.color, (int(px_w-cam_x), int(py_w-cam_y)), 12)
+            px_w, py_w = rp_x+p_petal_range*math.cos(r_orbit+(2*math.pi/5)*i), rp_y+p_petal_range*math.sin(r_orbit+(2*math.pi/5)*i)
+            surf, (ax, ay) = sprite_cache.get(("petal", p.shape, p.color), build_petal_sprite, p.shape, p.color, 24)
+            petal_blits.append((surf, (int(px_w-cam_x) - ax, int(py_w-cam_y) - ay)))
+    screen.blits(petal_blits, False)
+    profiler.lap("world")
     
-    draw_player_hud_restored(screen, WIDTH//2, HEIGHT//2, angle_mouse if 'angle_mouse' in locals() else 0, p_health, p_hit_time, p_lvl)
+    draw_player_hud_restored(screen, WIDTH//2, HEIGHT//2, angle_mouse, p_health, p_hit_time, p_lvl)
     draw_minimap(screen, player_w_pos, bees, queen_bee); draw_xp_tracker(screen, p_lvl, p_xp)
     
-    pygame.draw.rect(screen, (200, 50, 50), quit_btn_rect, border_radius=8); screen.blit(font_md.render("QUIT", True, (255, 255, 255)), (quit_btn_rect.centerx-20, quit_btn_rect.centery-10))
-    pygame.draw.rect(screen, (80, 80, 80), inv_btn_rect, border_radius=5); screen.blit(font_sm.render("INVENTORY", True, (255, 255, 255)), (32, HEIGHT-102))
-    pygame.draw.rect(screen, (80, 80, 80), buffs_btn_rect, border_radius=5); screen.blit(font_sm.render("BUFFS", True, (255, 255, 255)), (45, HEIGHT-142))
+    pygame.draw.rect(screen, (200, 50, 50), quit_btn_rect, border_radius=8); screen.blit(text_cache.render(font_md, "QUIT", True, (255, 255, 255)), (quit_btn_rect.centerx-20, quit_btn_rect.centery-10))
+    pygame.draw.rect(screen, (80, 80, 80), inv_btn_rect, border_radius=5); screen.blit(text_cache.render(font_sm, "INVENTORY", True, (255, 255, 255)), (32, HEIGHT-102))
+    pygame.draw.rect(screen, (80, 80, 80), buffs_btn_rect, border_radius=5); screen.blit(text_cache.render(font_sm, "BUFFS", True, (255, 255, 255)), (45, HEIGHT-142))
     
     for i, p in enumerate(hotbar):
         rx, ry = 20 + (i * 60), HEIGHT - 70
-        pygame.draw.rect(screen, (50, 50, 50), (rx, ry, 50, 50), border_radius=8)
-        if p.shape == "square": pygame.draw.rect(screen, p.color, (rx+15, ry+12, 20, 20))
-        else: pygame.draw.circle(screen, p.color, (rx+25, ry+22), 10)
-        p_name = font_sm.render(p.name, True, (200, 200, 200)); screen.blit(p_name, (rx + 25 - p_name.get_width()//2, ry + 36))
+        screen.blit(sprite_cache.get(("hotbar_slot", p.shape, p.color), build_hotbar_slot_sprite, p.shape, p.color)[0], (rx, ry))
+        p_name = text_cache.render(font_sm, p.name, True, (200, 200, 200)); screen.blit(p_name, (rx + 25 - p_name.get_width()//2, ry + 36))
         if not p.is_active:
-            ov = pygame.Surface((50, 50), pygame.SRCALPHA); ov.fill(COOLDOWN_OVERLAY); screen.blit(ov, (rx, ry))
+            screen.blit(sprite_cache.get(("cooldown",), build_cooldown_overlay_sprite)[0], (rx, ry))
     
-    if current_state == STATE_INVENTORY:
-        screen.fill((20, 20, 20))
-        ex = pygame.Rect(WIDTH-150, 30, 120, 50); pygame.draw.rect(screen, (150, 50, 50), ex, border_radius=8)
-        screen.blit(font_md.render("EXIT", True, (255, 255, 255)), (WIDTH-115, 42))
-        slots = []
-        for i, entry in enumerate(stored_petals):
-            ix, iy = 150 + (i % 8) * 110, 150 + (i // 8) * 110
-            r = pygame.Rect(ix, iy, 90, 90); pygame.draw.rect(screen, (60, 60, 60), r, border_radius=10)
-            if entry[0].shape == "square": pygame.draw.rect(screen, entry[0].color, (ix+25, iy+15, 40, 40))
-            else: pygame.draw.circle(screen, entry[0].color, (ix+45, iy+35), 25)
-            screen.blit(font_sm.render(f"{entry[1]}x {entry[0].name}", True, (255, 255, 255)), (ix+5, iy+70)); slots.append((r, i))
-        if pygame.mouse.get_pressed()[0]:
-            if ex.collidepoint(mx, my): current_state = STATE_GAME; time.sleep(0.2)
-            for r, idx in slots:
-                if r.collidepoint(mx, my): selected_for_swap_idx = idx; current_state = STATE_GAME; time.sleep(0.2)
-
-    if current_state == STATE_BUFFS:
-        screen.fill((20, 25, 30)); ex = pygame.Rect(WIDTH-150, 30, 120, 50); pygame.draw.rect(screen, (150, 50, 50), ex, border_radius=8)
-        screen.blit(font_md.render("EXIT", True, (255, 255, 255)), (WIDTH-115, 42))
-        screen.blit(font_md.render(f"BUFFS - Points: {p_lvl_points}", True, (255, 255, 255)), (WIDTH//2-80, 50))
-        bs = pygame.Rect(WIDTH//2-200, HEIGHT//2-75, 150, 150); pygame.draw.ellipse(screen, (0, 200, 100) if p_lvl_points >= 1 else (80, 80, 80), bs)
-        screen.blit(font_sm.render("Speed +1", True, (255, 255, 255)), (bs.centerx-30, bs.centery-5))
-        br = pygame.Rect(WIDTH//2+50, HEIGHT//2-75, 150, 150); pygame.draw.ellipse(screen, (0, 150, 255) if p_lvl_points >= 2 else (80, 80, 80), br)
-        screen.blit(font_sm.render("Range +1", True, (255, 255, 255)), (br.centerx-30, br.centery-5))
-        if pygame.mouse.get_pressed()[0]:
-            if ex.collidepoint(mx, my): current_state = STATE_GAME; time.sleep(0.2)
-            if bs.collidepoint(mx, my) and p_lvl_points >= 1: p_rotation_speed += 0.015; p_lvl_points -= 1; time.sleep(0.2)
-            if br.collidepoint(mx, my) and p_lvl_points >= 2: p_petal_range += 20; p_lvl_points -= 2; time.sleep(0.2)
-
     if current_state == STATE_DEAD:
         ov = pygame.Surface((WIDTH, HEIGHT), pygame.SRCALPHA); ov.fill((0, 0, 0, 180)); screen.blit(ov, (0, 0))
-        pygame.draw.rect(screen, (50, 150, 50), respawn_btn_rect, border_radius=12); screen.blit(font_md.render("RESPAWN", True, (255, 255, 255)), (respawn_btn_rect.centerx-45, respawn_btn_rect.centery-10))
+        pygame.draw.rect(screen, (50, 150, 50), respawn_btn_rect, border_radius=12); screen.blit(text_cache.render(font_md, "RESPAWN", True, (255, 255, 255)), (respawn_btn_rect.centerx-45, respawn_btn_rect.centery-10))
+
+def init_display(headless=False, size=None):
+    """Open the fullscreen window, or an off-screen display on SDL's dummy driver when headless,
+    and lay out the UI for its size."""
+    global WIDTH, HEIGHT, screen, clock, quit_btn_rect, inv_btn_rect, buffs_btn_rect, respawn_btn_rect
+    global exit_btn_rect, speed_buff_rect, range_buff_rect
+    if headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        if pygame.display.get_init() and pygame.display.get_driver() != "dummy": pygame.display.quit()
+        pygame.display.init()
+        WIDTH, HEIGHT = size or HEADLESS_SIZE
+        screen = pygame.display.set_mode((WIDTH, HEIGHT))
+    else:
+        pygame.display.init()
+        screen_info = pygame.display.Info()
+        WIDTH, HEIGHT = size or (screen_info.current_w, screen_info.current_h)
+        screen = pygame.display.set_mode((WIDTH, HEIGHT), pygame.FULLSCREEN)
+        pygame.display.set_caption("florr.io Clone - Fully Restored")
+    clock = pygame.time.Clock()
+    quit_btn_rect = pygame.Rect(20, 20, 100, 40)
+    inv_btn_rect = pygame.Rect(20, HEIGHT - 110, 100, 30)
+    buffs_btn_rect = pygame.Rect(20, HEIGHT - 150, 100, 30)
+    respawn_btn_rect = pygame.Rect(WIDTH//2 - 100, HEIGHT//2 + 20, 200, 60)
+    exit_btn_rect = pygame.Rect(WIDTH - 150, 30, 120, 50)
+    speed_buff_rect = pygame.Rect(WIDTH//2 - 200, HEIGHT//2 - 75, 150, 150)
+    range_buff_rect = pygame.Rect(WIDTH//2 + 50, HEIGHT//2 - 75, 150, 150)
+    startup.mark("display")
+
+# --- MAIN LOOP ---
+
+def main(source=None, headless=False, seed=None, max_frames=None, startup_report=None, time_scale=None):
+    """Run the game until quit, or for `max_frames` frames. `seed` makes spawns and loot
+    reproducible; with a scripted source and `headless` nothing waits on wall-clock time.
+    `time_scale` sets simulation speed, defaulting to the source's own (a replay's recorded one).
+    `startup_report` prints the startup milestones once the first frame is up: "-" prints only,
+    a path also appends them there as a JSON line."""
+    if seed is not None: random.seed(seed)
+    source = source or LiveInput()
+    reset_game()
+    sim_clock.time_scale = time_scale if time_scale is not None else getattr(source, "time_scale", 1.0)
+    running, accumulator, last_frame, frames, alpha = True, 0.0, time.perf_counter(), 0, 1.0
+    while running:
+        profiler.begin_frame()
+        frame_start = time.perf_counter()
+        accumulator += min(frame_start - last_frame, MAX_FRAME_TIME); last_frame = frame_start
+        (mx, my), events = source.poll()
+        running = handle_events(events, mx, my)
+        profiler.lap("events")
+        due = int(accumulator // SIM_DT); accumulator -= due * SIM_DT
+        ticks = source.ticks(due)
+        advance(ticks, mx, my)
+        if ticks != due: alpha = 1.0
+        elif not sim_clock.paused: alpha = sim_clock.alpha(accumulator / SIM_DT)  # Paused, hold the last pose
+
+        render_frame(alpha, mx, my)
+        if profiler.show_overlay:
+            tests = bees.tests + queen_missiles.tests + dropped_items.tests
+            profiler.draw(screen, font_sm, (f"collision tests: {tests}", f"text cache: {text_cache.hits} hit / {text_cache.misses} miss", f"timers pending: {sim_clock.pending()}"))
+        profiler.count("collision_tests", bees.tests + queen_missiles.tests + dropped_items.tests)
+        bees.tests = queen_missiles.tests = dropped_items.tests = 0
+        profiler.lap("hud")
+        pygame.display.flip(); profiler.lap("flip")
+        frames += 1
+        if frames == 1:
+            startup.mark("first_frame")
+            if startup_report is not None: startup.report(None if startup_report == "-" else startup_report)
+        if max_frames is not None and frames >= max_frames: running = False
+        if not headless: clock.tick(60)
+        profiler.lap("idle")
+    if profiler.export_prefix: profiler.export(profiler.export_prefix)
+
+startup.mark("imported")
 
-    pygame.display.flip(); clock.tick(60)
-pygame.quit()
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="florr.io clone")
+    parser.add_argument("--seed", type=int, help="seed spawns and loot for a reproducible run")
+    parser.add_argument("--record", metavar="PATH", help="save this session's input for --replay")
+    parser.add_argument("--replay", metavar="PATH", help="play back recorded input (implies --headless unless --window)")
+    parser.add_argument("--headless", action="store_true", help="run on the SDL dummy driver without a window")
+    parser.add_argument("--window", action="store_true", help="show the window during --replay")
+    parser.add_argument("--frames", type=int, help="quit after this many frames")
+    parser.add_argument("--time-scale", type=float, metavar="X", help="simulation speed, e.g. 0.5 for half speed (default: 1, or a replay's recorded speed)")
+    parser.add_argument("--startup-report", nargs="?", const="-", metavar="PATH",
+                        help="print time to first frame; with PATH also append it there as a JSON line")
+    args = parser.parse_args()
+    headless = args.headless or (args.replay is not None and not args.window)
+    source = replay_input(args.replay) if args.replay else LiveInput()
+    if args.record: source = InputRecorder(source)
+    init_display(headless=headless)
+    try:
+        main(source, headless=headless, seed=args.seed, max_frames=args.frames, startup_report=args.startup_report,
+             time_scale=args.time_scale)
+    finally:
+        if args.record: source.save(args.record)
+        pygame.quit()
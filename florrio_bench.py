@@ -0,0 +1,229 @@
+"""Headless, seeded benchmark scenarios for florrio.py.
+
+    python florrio_bench.py                      # run every scenario, compare to bench_baseline.json
+    python florrio_bench.py swarm barrage        # run a subset
+    python florrio_bench.py --save-baseline      # record the current numbers as the baseline
+
+Each scenario drives the real simulation and render pass on SDL's dummy driver with a scripted
+mouse, one tick per frame, so two runs with the same seed simulate exactly the same game. The
+report gives simulation ticks/sec, full-frame percentiles and peak traced memory (from a separate, shorter traced pass), plus a digest of
+the final game state: a digest change means behaviour changed, not just speed. The `startup`
+measurement launches florrio.py in fresh processes and reports the median time to first frame.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pygame
+
+import florrio as game
+
+BASELINE_PATH = "bench_baseline.json"
+DEFAULT_FRAMES = 600
+STARTUP_RUNS = 5  # Fresh processes launched for the startup measurement; the median is reported
+MEMORY_FRAMES = 120  # Frames replayed under tracemalloc for the peak-memory figure
+REGRESSION_TOLERANCE = 0.15  # Fractional slowdown in ticks/sec or p95 before a scenario is flagged
+
+# --- SCENARIOS ---
+# A scenario sets the world up after reset_game() and returns a per-frame hook that may nudge
+# state (keep the player alive, keep emitters firing) and returns the scripted mouse position.
+
+def orbit_mouse(frame, radius=250, period=240):
+    a = 2 * math.pi * frame / period
+    return (int(game.WIDTH//2 + radius * math.cos(a)), int(game.HEIGHT//2 + radius * math.sin(a)))
+
+def immortal():
+    game.p_health = 100
+
+def scenario_swarm(bees=2000):
+    """`bees` aggressive bees converging on the player."""
+    game.BEE_COUNT = bees
+    game.reset_game()
+    game.bees.is_aggressive[:] = True
+    def frame(i):
+        immortal()
+        return orbit_mouse(i)
+    return frame
+
+def scenario_barrage(burst=24, every=2):
+    """Queen parked next to the player firing full-circle bursts; a few thousand live missiles."""
+    game.reset_game()
+    game.queen_bee.pos[:] = (game.player_w_pos[0] + 300, game.player_w_pos[1])
+    def frame(i):
+        immortal()
+        if i % every == 0:
+            qx, qy = game.queen_bee.pos
+            game.queen_missiles.fire(qx, qy, game.player_w_pos, count=burst, spread=2 * math.pi * (burst - 1) / burst)
+        return orbit_mouse(i, radius=120)
+    return frame
+
+def scenario_loot(drops=1000):
+    """`drops` loot piles around the player, collected as the player circles through them. The
+    drop cap is lifted for the run so all of them stay on the ground."""
+    game.reset_game()
+    game.dropped_items.cap = max(game.LOOT_CAP, drops)
+    side = int(math.ceil(math.sqrt(drops)))
+    kinds = ("Basic", "Light", "Glass", "Stinger")
+    for i in range(drops):
+        x, y = (i % side - side / 2) * 45, (i // side - side / 2) * 45
+        game.dropped_items.drop(x, y, kinds[i % len(kinds)])
+    def frame(i):
+        immortal()
+        return orbit_mouse(i, radius=350, period=400)
+    return frame
+
+def scenario_inventory(kinds=500):
+    """Inventory screen open with `kinds` distinct petal stacks."""
+    game.reset_game()
+    for i in range(kinds):
+        game.add_to_inventory(f"Petal {i}", ((i * 37) % 256, (i * 91) % 256, (i * 53) % 256), 20, "square" if i % 3 == 0 else "circle", 3.0, 1 + i % 9)
+    game.current_state = game.STATE_INVENTORY
+    def frame(i):
+        return (game.WIDTH - 40, game.HEIGHT - 40)
+    return frame
+
+def scenario_bigworld(scale=10, bees=3000):
+    """World `scale` times wider with `bees` bees, most far from the player; every bee chases.
+    Frame cost should stay close to `swarm`, since dormant chunks only get a coarse step."""
+    game.WORLD_SIZE, game.BEE_COUNT = DEFAULTS["WORLD_SIZE"] * scale, bees
+    game.reset_game()
+    game.bees.is_aggressive[:] = True
+    def frame(i):
+        immortal()
+        return orbit_mouse(i)
+    return frame
+
+SCENARIOS = {"swarm": scenario_swarm, "barrage": scenario_barrage, "loot": scenario_loot, "inventory": scenario_inventory,
+             "bigworld": scenario_bigworld}
+
+# --- RUNNER ---
+
+DEFAULTS = {"WORLD_SIZE": game.WORLD_SIZE, "BEE_COUNT": game.BEE_COUNT}  # Tunables scenarios may override
+
+def reset_persistent_state():
+    """Put the module-level progression back to a fresh start so scenarios do not leak into each other."""
+    game.p_lvl, game.p_xp, game.p_lvl_points = 1, 0, 0
+    game.p_rotation_speed, game.p_petal_range = game.PLAYER_ROTATION_SPEED, game.PLAYER_PETAL_RANGE
+    game.hotbar[:] = [game.Petal("Basic", game.BASIC_COLOR) for _ in range(5)]
+    game.clear_inventory(); game.inventory_scroll = 0
+    game.dropped_items.cap = game.LOOT_CAP
+    game.selected_for_swap_idx = None
+    game.sim_clock = game.SimClock()
+    for name, value in DEFAULTS.items(): setattr(game, name, value)
+
+def state_digest():
+    h = hashlib.sha1()
+    h.update(np.asarray(game.player_w_pos, dtype=float).tobytes())
+    h.update(game.bees.pos.tobytes()); h.update(game.bees.health.tobytes())
+    h.update(game.queen_missiles.pos[:game.queen_missiles.n].tobytes())
+    h.update(repr((game.p_lvl, game.p_xp, len(game.dropped_items), [(e[0].name, e[1]) for e in game.stored_petals])).encode())
+    return h.hexdigest()[:12]
+
+def drive(name, frames, seed, warmup):
+    """Run scenario `name` from a fresh seeded start; per-frame (sim_ns, frame_ns) after warmup."""
+    random.seed(seed)
+    reset_persistent_state()
+    hook = SCENARIOS[name]()
+    samples = []
+    for i in range(warmup + frames):
+        mx, my = hook(i)
+        t0 = time.perf_counter_ns()
+        game.advance(1, mx, my)
+        t1 = time.perf_counter_ns()
+        game.render_frame(1.0, mx, my)
+        pygame.display.flip()
+        t2 = time.perf_counter_ns()
+        if i >= warmup: samples.append((t1 - t0, t2 - t0))
+    return samples
+
+def run_scenario(name, frames=DEFAULT_FRAMES, seed=0, warmup=30):
+    samples = drive(name, frames, seed, warmup)
+    digest = state_digest()
+    # tracemalloc slows allocation-heavy code several-fold, so memory gets its own shorter pass
+    tracemalloc.start()
+    drive(name, min(frames, MEMORY_FRAMES), seed, warmup)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    sim_ns = sum(s for s, _ in samples)
+    p50, p95, p99 = (np.percentile([f for _, f in samples], (50, 95, 99)) / 1e6).tolist()
+    return {"ticks_per_sec": frames / max(sim_ns, 1) * 1e9, "frame_ms_p50": p50, "frame_ms_p95": p95,
+            "frame_ms_p99": p99, "peak_mem_mb": peak / 2**20, "digest": digest}
+
+def measure_startup(runs=STARTUP_RUNS):
+    """Median startup milestones of `runs` headless launches of florrio.py, quitting after one frame."""
+    script = os.path.join(os.path.dirname(os.path.abspath(game.__file__)), "florrio.py")
+    with tempfile.TemporaryDirectory() as tmp:
+        log = os.path.join(tmp, "startup.jsonl")
+        for _ in range(runs):
+            subprocess.run([sys.executable, script, "--headless", "--frames", "1", "--startup-report", log],
+                           check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        with open(log) as f: rows = [json.loads(line) for line in f]
+    return {k: float(np.median([r[k] for r in rows])) for k in rows[0]}
+
+def compare(results, baseline, tolerance):
+    """Lines describing regressions against `baseline`; empty when everything is within tolerance."""
+    problems = []
+    for name, r in results.items():
+        b = baseline.get(name)
+        if b is None: continue
+        if name == "startup":
+            if r["first_frame_ms"] > b["first_frame_ms"] * (1 + tolerance):
+                problems.append(f"startup: first frame {r['first_frame_ms']:.1f} ms vs baseline {b['first_frame_ms']:.1f} ms")
+            continue
+        if r["ticks_per_sec"] < b["ticks_per_sec"] * (1 - tolerance):
+            problems.append(f"{name}: ticks/sec {r['ticks_per_sec']:.0f} vs baseline {b['ticks_per_sec']:.0f}")
+        if r["frame_ms_p95"] > b["frame_ms_p95"] * (1 + tolerance):
+            problems.append(f"{name}: p95 {r['frame_ms_p95']:.2f} ms vs baseline {b['frame_ms_p95']:.2f} ms")
+        if r["digest"] != b["digest"]:
+            problems.append(f"{name}: state digest {r['digest']} != baseline {b['digest']} (simulation changed)")
+    return problems
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scenarios", nargs="*", help=f"any of {', '.join(SCENARIOS)}, startup (default: all)")
+    parser.add_argument("--frames", type=int, default=DEFAULT_FRAMES)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE)
+    args = parser.parse_args(argv)
+    unknown = [n for n in args.scenarios if n not in SCENARIOS and n != "startup"]
+    if unknown: parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    game.init_display(headless=True)
+    results = {}
+    for name in args.scenarios or [*SCENARIOS, "startup"]:
+        if name == "startup":
+            results[name] = r = measure_startup()
+            print(f"{'startup':<10} first frame {r['first_frame_ms']:7.1f} ms  imported {r['imported_ms']:7.1f} ms  "
+                  f"display {r['display_ms']:7.1f} ms  fonts {r['fonts_ms']:5.1f} ms")
+            continue
+        results[name] = r = run_scenario(name, args.frames, args.seed)
+        print(f"{name:<10} {r['ticks_per_sec']:>9.0f} ticks/s  p50 {r['frame_ms_p50']:6.2f}  p95 {r['frame_ms_p95']:6.2f}  "
+              f"p99 {r['frame_ms_p99']:6.2f} ms  peak {r['peak_mem_mb']:6.1f} MB  digest {r['digest']}")
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f: json.dump(results, f, indent=2)
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    if not os.path.exists(args.baseline):
+        print(f"no baseline at {args.baseline}; run with --save-baseline to create one")
+        return 0
+    with open(args.baseline) as f: problems = compare(results, json.load(f), args.tolerance)
+    for line in problems: print("REGRESSION", line)
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,105 @@
+"""Bot-client load generator for florrio_server.py.
+
+    python florrio_bots.py --bots 300 --duration 30            # against a running server
+    python florrio_bots.py --bots 300 --duration 30 --spawn    # start a local server too
+
+Every bot is a real protocol client on its own connection: it wanders by sending a fresh aim a few
+times a second, asks to respawn when it dies, and decodes every snapshot it receives. At the end
+the bots report received bandwidth per player and snapshot rate; with --spawn the server's own
+tick-time and bandwidth lines are printed alongside.
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+from florrio_server import (INPUT, MSG_INPUT, MSG_RESPAWN, MSG_SNAPSHOT, RESPAWN, SERVER_HOST, SERVER_PORT,
+                            WELCOME, decode_snapshot, frame, read_message)
+
+INPUT_HZ = 5  # Aim updates per second per bot
+CONNECT_RATE = 200  # New connections per second while ramping up
+
+class BotStats:
+    def __init__(self):
+        self.bytes = self.snapshots = 0
+        self.entities = 0  # Records decoded across every section
+        self.deaths = 0
+
+async def run_bot(host, port, stats, stop, rng):
+    reader, writer = await asyncio.open_connection(host, port)
+    WELCOME.unpack(await read_message(reader))
+    async def steer():
+        ax = ay = 0
+        while not stop.is_set():
+            if rng.random() < 0.3: ax, ay = rng.randint(-600, 600), rng.randint(-350, 350)
+            writer.write(frame(INPUT.pack(MSG_INPUT, ax, ay)))
+            await asyncio.sleep(1 / INPUT_HZ)
+    steering = asyncio.create_task(steer())
+    try:
+        while not stop.is_set():
+            msg = await read_message(reader)
+            stats.bytes += len(msg) + 4
+            if msg[0] != MSG_SNAPSHOT: continue
+            header, sections = decode_snapshot(msg)
+            stats.snapshots += 1; stats.entities += sum(len(recs) for recs in sections.values())
+            if header[4] <= 0:
+                stats.deaths += 1; writer.write(frame(RESPAWN.pack(MSG_RESPAWN)))
+    except (asyncio.IncompleteReadError, ConnectionError):
+        pass
+    finally:
+        steering.cancel(); writer.close()
+
+async def swarm(host, port, bots, duration, seed):
+    stop, rng = asyncio.Event(), random.Random(seed)
+    stats = [BotStats() for _ in range(bots)]
+    tasks = []
+    for s in stats:
+        tasks.append(asyncio.create_task(run_bot(host, port, s, stop, random.Random(rng.random()))))
+        await asyncio.sleep(1 / CONNECT_RATE)
+    start = time.perf_counter()
+    for s in stats: s.bytes = s.snapshots = s.entities = 0  # Measure steady state, not the ramp-up
+    await asyncio.sleep(duration)
+    elapsed = time.perf_counter() - start
+    stop.set()
+    for t in tasks: t.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    return stats, elapsed
+
+def report(stats, elapsed):
+    kib = np.array([s.bytes for s in stats]) / elapsed / 1024
+    rate = np.array([s.snapshots for s in stats]) / elapsed
+    snaps = max(1, sum(s.snapshots for s in stats))
+    print(f"bots {len(stats)}  snapshots/s per bot {rate.mean():.1f}  KiB/s per bot mean {kib.mean():.2f} "
+          f"p95 {np.percentile(kib, 95):.2f} max {kib.max():.2f}  records/snapshot {sum(s.entities for s in stats) / snaps:.1f}  "
+          f"bytes/snapshot {sum(s.bytes for s in stats) / snaps:.0f}  deaths {sum(s.deaths for s in stats)}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--bots", type=int, default=200)
+    parser.add_argument("--duration", type=float, default=20.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--spawn", action="store_true", help="start florrio_server.py as a child process for the run")
+    parser.add_argument("--server-args", default="", help="extra arguments for the spawned server")
+    args = parser.parse_args(argv)
+
+    server = None
+    if args.spawn:
+        here = os.path.dirname(os.path.abspath(__file__))
+        server = subprocess.Popen([sys.executable, os.path.join(here, "florrio_server.py"), "--host", args.host,
+                                   "--port", str(args.port), "--seed", str(args.seed), *args.server_args.split()])
+        time.sleep(2.0)  # Let it import and bind before the first connection
+    try:
+        report(*asyncio.run(swarm(args.host, args.port, args.bots, args.duration, args.seed)))
+    finally:
+        if server is not None:
+            server.terminate(); server.wait()
+
+if __name__ == "__main__":
+    main()
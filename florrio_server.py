@@ -0,0 +1,512 @@
+"""Authoritative multiplayer server for florrio.py.
+
+    python florrio_server.py                     # serve on 127.0.0.1:7777
+    python florrio_server.py --bees 300 --port 9000
+
+One asyncio process steps the shared world at SIM_HZ and streams each client delta snapshots of
+what is within its radar. florrio_bots.py is the matching load generator.
+"""
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import argparse
+import asyncio
+import math
+import random
+import signal
+import struct
+import time
+from collections import deque
+
+import numpy as np
+
+import florrio as game
+
+SERVER_HOST, SERVER_PORT = "127.0.0.1", 7777
+SNAPSHOT_HZ = 20  # Snapshots per second per client; the world itself steps at game.SIM_HZ
+MAX_PLAYERS = 1024
+MAX_BACKLOG = 64 * 1024  # Unsent bytes queued for a client before its snapshots are skipped
+SPAWN_SPREAD = 1000  # Players (re)spawn uniformly within this distance of the centre on each axis
+STATS_INTERVAL = 5.0
+PETAL_SLOTS = 5
+KEY_MASK, ROUND_TAG = (1 << 62) - 1, 1 << 62  # Held entries are a record key plus the round tag of the slot's last send
+VIEW_CELL = game.RADAR_RANGE // 4  # Cell edge of the per-round indexes that gather what each client can see
+RETARGET_TICKS = 10  # A chasing bee looks for the nearest player this often (staggered), or when its target is gone
+MAX_AIM = (game.HEADLESS_SIZE[0] // 2, game.HEADLESS_SIZE[1] // 2)  # Aim is a mouse offset from screen centre, so it stays on screen
+PETAL_DAMAGE, PETAL_COOLDOWN = 20, 3.0  # Every player starts with a hotbar of Basic petals
+
+# --- PROTOCOL ---
+# Every message is a little-endian uint32 length followed by the payload; the payload's first byte
+# is its type. A snapshot is the header, then seven sections in a fixed order, each a uint16
+# count followed by that many records: players, players gone, bees, bees gone, missiles, loot,
+# loot gone. Positions are world coordinates rounded to int16; angles are quantized to 256 steps.
+
+MSG_WELCOME, MSG_SNAPSHOT, MSG_INPUT, MSG_RESPAWN = 1, 2, 3, 4
+FRAME = struct.Struct("<I")
+WELCOME = struct.Struct("<BHHH")  # type, player slot, snapshot rate, world half-size
+INPUT = struct.Struct("<Bhh")  # type, aim offset from the player (the mouse offset from screen centre)
+RESPAWN = struct.Struct("<B")
+SNAP_HEADER = struct.Struct("<BIhhhBBHI")  # type, tick, x, y, health, orbit, ready petal bits, lvl, xp
+COUNT = struct.Struct("<H")
+QUEEN_INDEX = 0xFFFF  # Bee record index used for the queen
+BEE_QUEEN, BEE_AGGRESSIVE = 1, 2  # Bee record flag bits
+LOOT_KINDS = ("Basic", "Light", "Glass", "Stinger")
+PLAYER_REC = np.dtype([("slot", "<u2"), ("x", "<i2"), ("y", "<i2"), ("health", "<i2"), ("orbit", "u1")])
+BEE_REC = np.dtype([("idx", "<u2"), ("x", "<i2"), ("y", "<i2"), ("health", "<i2"), ("flags", "u1")])
+MISSILE_REC = np.dtype([("x", "<i2"), ("y", "<i2"), ("angle", "u1")])
+LOOT_REC = np.dtype([("uid", "<u4"), ("x", "<i2"), ("y", "<i2"), ("kind", "u1"), ("count", "<u2")])
+SECTIONS = (("players", PLAYER_REC), ("players_gone", np.dtype("<u2")), ("bees", BEE_REC), ("bees_gone", np.dtype("<u2")),
+            ("missiles", MISSILE_REC), ("loot", LOOT_REC), ("loot_gone", np.dtype("<u4")))
+
+def quantize_angle(a):
+    return (np.round(np.asarray(a) * (256 / (2 * math.pi))).astype(np.int64) & 0xFF).astype(np.uint8)
+
+def record_keys(recs):
+    """One int64 per record packing every field but the leading id, so a single comparison tells
+    whether a client's copy is stale. Every record type here packs into at most 56 bits."""
+    keys = np.zeros(len(recs), dtype=np.int64)
+    for name in recs.dtype.names[1:]:
+        col = recs[name]; size = col.dtype.itemsize
+        keys = (keys << (8 * size)) | col.astype(f"u{size}").astype(np.int64)
+    return keys
+
+def opaque(recs):
+    """`recs` viewed as fixed-size byte strings, which fancy indexing copies far faster than records."""
+    return recs.view(np.dtype((np.void, recs.dtype.itemsize)))
+
+def split_by_client(ci, recs, k):
+    """(count, bytes) per client 0..k-1 for `recs`, already grouped by the sorted client index `ci`."""
+    buf, size = recs.tobytes(), recs.dtype.itemsize
+    counts = np.bincount(ci, minlength=k); ends = np.cumsum(counts) * size
+    return [(c, buf[b - c * size:b]) for c, b in zip(counts.tolist(), ends.tolist())]
+
+def decode_snapshot(payload):
+    """(header tuple, {section: record array}) from a snapshot payload."""
+    header = SNAP_HEADER.unpack_from(payload)
+    off, sections = SNAP_HEADER.size, {}
+    for name, dtype in SECTIONS:
+        (n,) = COUNT.unpack_from(payload, off); off += COUNT.size
+        sections[name] = np.frombuffer(payload, dtype=dtype, count=n, offset=off); off += n * dtype.itemsize
+    return header, sections
+
+def frame(payload):
+    return FRAME.pack(len(payload)) + payload
+
+async def read_message(reader):
+    (n,) = FRAME.unpack(await reader.readexactly(FRAME.size))
+    return await reader.readexactly(n)
+
+# --- WORLD ---
+
+def nearest(points, xy, reach=game.GRID_CELL_SIZE, exact=4 * game.GRID_CELL_SIZE):
+    """Row of the (n, 2) array `points` nearest to each row of `xy`, -1 if `points` is empty. Exact
+    within `exact`; farther out, one point per occupied `exact`-sized cell stands in for the rest."""
+    best = np.full(len(xy), -1, dtype=np.int64)
+    if len(points) == 0: return best
+    cells = np.floor_divide(points, exact).astype(np.int64)
+    occupied, reps = np.unique(game.CellIndex._cell_keys(cells[:, 0], cells[:, 1]), return_index=True)
+    home = np.floor_divide(xy, exact).astype(np.int64)
+    crowded = np.zeros(len(xy), dtype=bool)
+    for dx in (-1, 0, 1):
+        for dy in (-1, 0, 1):
+            keys = game.CellIndex._cell_keys(home[:, 0] + dx, home[:, 1] + dy)
+            crowded |= occupied[np.minimum(np.searchsorted(occupied, keys), len(occupied) - 1)] == keys
+    grid, todo, far = game.CellIndex(points), np.flatnonzero(crowded), [np.flatnonzero(~crowded)]
+    while len(todo) and reach <= exact:
+        q, c = grid.candidates(xy[todo], reach)
+        dist = np.hypot(points[c, 0] - xy[todo[q], 0], points[c, 1] - xy[todo[q], 1])
+        inside = dist < reach
+        q, c, dist = q[inside], c[inside], dist[inside]
+        order = np.lexsort((dist, q))
+        found, first = np.unique(q[order], return_index=True)
+        best[todo[found]] = c[order[first]]
+        settled = np.zeros(len(todo), dtype=bool); settled[found] = True
+        todo, reach = todo[~settled], reach * 2
+    todo = np.concatenate([todo, *far])
+    if len(todo):
+        dist = np.hypot(xy[todo, None, 0] - points[None, reps, 0], xy[todo, None, 1] - points[None, reps, 1])
+        best[todo] = reps[np.argmin(dist, axis=1)]
+    return best
+
+class PlayerTable:
+    """Struct-of-arrays store for every connected player, one row per slot. `active` marks rows
+    in use; a slot is reused once its player disconnects."""
+    def __init__(self, capacity=MAX_PLAYERS):
+        self.active = np.zeros(capacity, dtype=bool)
+        self.pos, self.aim = np.zeros((capacity, 2)), np.zeros((capacity, 2))
+        self.health, self.hit_time = np.zeros(capacity, dtype=np.int64), np.zeros(capacity)
+        self.regen_at = np.zeros(capacity)  # Next regen pulse; pushed back whenever the player attacks
+        self.orbit = np.zeros(capacity)
+        self.rotation_speed, self.petal_range = np.full(capacity, game.PLAYER_ROTATION_SPEED), np.full(capacity, float(game.PLAYER_PETAL_RANGE))
+        self.petal_damage = np.full((capacity, PETAL_SLOTS), PETAL_DAMAGE, dtype=np.int64)
+        self.petal_cooldown = np.full((capacity, PETAL_SLOTS), PETAL_COOLDOWN)
+        self.petal_ready_at = np.zeros((capacity, PETAL_SLOTS))
+        self.lvl, self.xp, self.lvl_points = np.ones(capacity, dtype=np.int64), np.zeros(capacity, dtype=np.int64), np.zeros(capacity, dtype=np.int64)
+        self.inventory = [None] * capacity  # Petal name -> count, per slot
+        self.high_water = 0  # One past the highest slot ever used; rows beyond it are never live
+    def __len__(self): return int(self.active.sum())
+    def join(self):
+        free = np.flatnonzero(~self.active)
+        if len(free) == 0: return None
+        slot = int(free[0])
+        self.active[slot], self.high_water = True, max(self.high_water, slot + 1)
+        self.lvl[slot], self.xp[slot], self.lvl_points[slot] = 1, 0, 0
+        self.rotation_speed[slot], self.petal_range[slot] = game.PLAYER_ROTATION_SPEED, game.PLAYER_PETAL_RANGE
+        self.petal_damage[slot], self.petal_cooldown[slot] = PETAL_DAMAGE, PETAL_COOLDOWN
+        self.inventory[slot] = {}
+        self.spawn(slot)
+        return slot
+    def spawn(self, slot):
+        self.pos[slot] = (random.uniform(-SPAWN_SPREAD, SPAWN_SPREAD), random.uniform(-SPAWN_SPREAD, SPAWN_SPREAD))
+        self.aim[slot], self.health[slot], self.hit_time[slot], self.orbit[slot] = 0, game.PLAYER_MAX_HEALTH, 0, 0
+        self.regen_at[slot] = game.sim_clock.now + game.REGEN_INTERVAL
+        self.petal_ready_at[slot] = 0
+    def leave(self, slot):
+        self.active[slot] = False; self.inventory[slot] = None
+    def add_xp(self, slot, amount):
+        self.xp[slot] += amount
+        req = game.xp_required(self.lvl[slot])
+        if self.xp[slot] >= req: self.xp[slot] -= req; self.lvl[slot] += 1; self.lvl_points[slot] += 1
+
+class World:
+    """Everything the server simulates. `step` is step_game() for all players at once, with bees
+    and the queen chasing whichever living player is nearest."""
+    def __init__(self, bee_count=game.BEE_COUNT, seed=None):
+        if seed is not None: random.seed(seed)
+        self.clock = game.sim_clock = game.SimClock()  # florrio's entity classes schedule on this global
+        self.players = PlayerTable()
+        self.bees = game.BeeSwarm(bee_count, chunked=True)  # Only chunks near some player simulate at full rate
+        self.queen = game.BeeSwarm(1, is_queen=True, spawn_margin=500)
+        self.missiles, self.loot = game.MissilePool(), game.LootManager()
+        self.bee_killer, self.queen_killer = np.full(bee_count, -1, dtype=np.int64), -1  # Slot that landed the last hit
+        self.bee_target = np.full(bee_count, -1, dtype=np.int64)  # Slot each chasing bee is after
+        self.loot_ids, self._next_loot_id = {}, 1
+
+    def living(self):
+        pl = self.players
+        return np.flatnonzero(pl.active & (pl.health > 0))
+
+    def step(self):
+        pl, now = self.players, self.clock.now
+        live = self.living()
+        pos = pl.pos
+
+        pos[live] += pl.aim[live] * game.PLAYER_EASE
+        np.clip(pos, -game.WORLD_SIZE, game.WORLD_SIZE, out=pos)
+
+        # Missiles
+        self.missiles.update()
+        p, m = self.missiles.pairs(pos[live], game.MISSILE_HIT_REACH)
+        if len(p):
+            np.subtract.at(pl.health, live[p], self.missiles.damage[m]); pl.hit_time[live[p]] = now
+            self.missiles.kill(m)
+
+        # Queen
+        q = self.queen
+        if q.health[0] <= 0:
+            if not q.dropped_loot[0]:
+                if self.queen_killer >= 0 and pl.active[self.queen_killer]: pl.add_xp(self.queen_killer, game.QUEEN_XP)
+                game.drop_queen_loot(self.loot, float(q.pos[0, 0]), float(q.pos[0, 1]))
+                q.dropped_loot[0] = True; self.queen_killer = -1
+        elif len(live):
+            dq = np.hypot(pos[live, 0] - q.pos[0, 0], pos[live, 1] - q.pos[0, 1])
+            near = int(np.argmin(dq))
+            q.update(pos[live[near]])
+            if dq[near] < game.MISSILE_RANGE and q.missile_ready[0]:
+                self.missiles.fire(q.pos[0, 0], q.pos[0, 1], pos[live[near]])
+                q.missile_ready[0] = False; self.clock.call_later(game.MISSILE_RELOAD_TIME, q.reload, 0)
+            close = live[dq < game.QUEEN_CONTACT_REACH]
+            if len(close):
+                d = np.hypot(pos[close, 0] - q.pos[0, 0], pos[close, 1] - q.pos[0, 1])
+                pos[close] += (pos[close] - q.pos[0]) / np.maximum(1, d)[:, None] * game.QUEEN_KNOCKBACK
+                hurt = close[now - pl.hit_time[close] > game.HIT_COOLDOWN]
+                pl.health[hurt] -= game.QUEEN_CONTACT_DAMAGE; pl.hit_time[hurt] = now
+
+        # Bees
+        bees = self.bees
+        for i in bees.collect_dead().tolist():
+            killer = int(self.bee_killer[i]); self.bee_killer[i] = -1
+            if killer >= 0 and pl.active[killer]: pl.add_xp(killer, game.BEE_XP)
+            self.loot.drop(float(bees.pos[i, 0]), float(bees.pos[i, 1]), game.roll_bee_loot())
+        bees.set_focus(pos[live])
+        chasing = (bees.health > 0) & bees.is_aggressive
+        chase = np.flatnonzero(chasing if bees.lod_due else chasing & bees.awake)  # Dormant bees only use a target on their coarse step
+        targets = bees.pos.copy()
+        if len(chase) and len(live):
+            alive, target = np.zeros(len(pl.active), dtype=bool), self.bee_target
+            alive[live] = True
+            stale = chase[(target[chase] < 0) | ~alive[target[chase]] | ((self.clock.ticks + chase) % RETARGET_TICKS == 0)]
+            target[stale] = live[nearest(pos[live], bees.pos[stale])]
+            targets[chase] = pos[target[chase]]
+        bees.update(targets)
+        p, b = bees.pairs(pos[live], game.BEE_CONTACT_REACH)
+        if len(p):
+            d = pos[live[p]] - bees.pos[b]
+            push = np.zeros((len(live), 2))
+            np.add.at(push, p, d / np.maximum(1, np.hypot(d[:, 0], d[:, 1]))[:, None] * game.BEE_KNOCKBACK)
+            touched = np.unique(p)
+            pos[live[touched]] += push[touched]
+            hurt = live[touched][now - pl.hit_time[live[touched]] > game.HIT_COOLDOWN]
+            pl.health[hurt] -= game.BEE_CONTACT_DAMAGE; pl.hit_time[hurt] = now
+
+        # Loot
+        if len(self.loot):
+            for slot in live.tolist():
+                for drop in self.loot.pickup(pos[slot, 0], pos[slot, 1], game.LOOT_PICKUP_REACH):
+                    inv = pl.inventory[slot]; inv[drop.type] = inv.get(drop.type, 0) + drop.count
+
+        # Petals
+        pl.orbit[live] += pl.rotation_speed[live]
+        ang = pl.orbit[live, None] + (2 * math.pi / PETAL_SLOTS) * np.arange(PETAL_SLOTS)
+        xy = np.stack((pos[live, 0, None] + pl.petal_range[live, None] * np.cos(ang),
+                       pos[live, 1, None] + pl.petal_range[live, None] * np.sin(ang)), axis=-1)
+        ready = pl.petal_ready_at[live] <= now
+        owner, slot_i = np.nonzero(ready)
+        pts, dmg = xy[owner, slot_i], pl.petal_damage[live[owner], slot_i]
+        struck = np.zeros(len(pts), dtype=bool)
+        if q.health[0] > 0 and len(pts):
+            on_queen = np.flatnonzero(np.hypot(pts[:, 0] - q.pos[0, 0], pts[:, 1] - q.pos[0, 1]) < game.PETAL_QUEEN_REACH)
+            if len(on_queen):
+                q.take_damage(np.zeros(len(on_queen), dtype=np.int64), dmg[on_queen])
+                self.queen_killer = int(live[owner[on_queen[-1]]]); struck[on_queen] = True
+        p, b = bees.pairs(pts, game.PETAL_BEE_REACH)
+        if len(p):
+            bees.take_damage(b, dmg[p])
+            self.bee_killer[b] = live[owner[p]]; struck[p] = True
+        hit_owner, hit_slot = live[owner[struck]], slot_i[struck]
+        pl.petal_ready_at[hit_owner, hit_slot] = now + pl.petal_cooldown[hit_owner, hit_slot]
+        pl.regen_at[hit_owner] = now + game.REGEN_INTERVAL
+
+        # Regen
+        due = live[pl.regen_at[live] <= now]
+        pl.health[due] = np.minimum(game.PLAYER_MAX_HEALTH, pl.health[due] + game.REGEN_AMOUNT); pl.regen_at[due] += game.REGEN_INTERVAL
+
+        self.clock.tick()
+
+    def loot_id(self, d):
+        uid = self.loot_ids.get(d)
+        if uid is None: uid = self.loot_ids[d] = self._next_loot_id; self._next_loot_id += 1
+        return uid
+
+    def snapshot_tables(self):
+        """Quantized records for every player, bee, missile and drop, computed once per snapshot
+        round and then filtered per client."""
+        pl, bees, q = self.players, self.bees, self.queen
+        hw = pl.high_water
+        players = np.zeros(hw, dtype=PLAYER_REC)
+        players["slot"] = np.arange(hw)
+        players["x"], players["y"] = np.rint(pl.pos[:hw, 0]), np.rint(pl.pos[:hw, 1])
+        players["health"] = np.clip(pl.health[:hw], 0, 0x7FFF); players["orbit"] = quantize_angle(pl.orbit[:hw])
+        all_pos = np.concatenate((bees.pos, q.pos))
+        bee_recs = np.zeros(len(all_pos), dtype=BEE_REC)
+        bee_recs["idx"] = np.append(np.arange(len(bees.pos)), QUEEN_INDEX)
+        bee_recs["x"], bee_recs["y"] = np.rint(all_pos[:, 0]), np.rint(all_pos[:, 1])
+        health = np.concatenate((bees.health, q.health))
+        bee_recs["health"] = np.clip(health, 0, 0x7FFF)
+        bee_recs["flags"] = np.append(np.zeros(len(bees.pos), dtype=np.uint8), BEE_QUEEN) | np.where(np.concatenate((bees.is_aggressive, q.is_aggressive)), BEE_AGGRESSIVE, 0)
+        n = self.missiles.n
+        missiles = np.zeros(n, dtype=MISSILE_REC)
+        missiles["x"], missiles["y"] = np.rint(self.missiles.pos[:n, 0]), np.rint(self.missiles.pos[:n, 1])
+        missiles["angle"] = quantize_angle(self.missiles.angle[:n])
+        self.loot_ids = {d: uid for d, uid in self.loot_ids.items() if d in self.loot.drops}
+        drops = list(self.loot.drops)
+        loot = np.array([(self.loot_id(d), round(d.pos[0]), round(d.pos[1]), LOOT_KINDS.index(d.type), min(d.count, 0xFFFF))
+                         for d in drops], dtype=LOOT_REC)
+        return {"players": players, "player_pos": pl.pos[:hw], "player_live": pl.active[:hw].copy(),
+                "bees": bee_recs, "bee_pos": all_pos, "bee_live": (health > 0) & np.append(bees.awake, True),
+                "missiles": missiles, "missile_pos": self.missiles.pos[:n],
+                "loot": loot, "loot_pos": np.array([d.pos for d in drops], dtype=float).reshape(-1, 2)}
+
+class InterestManager:
+    """What every client was last sent: per section a (slot, row) table of record keys, -1 where
+    nothing is held, except loot, which comes and goes and is kept as sorted (slot, uid) keys."""
+    def __init__(self):
+        self.held, self.shown = {}, {}  # section -> table; section -> (slots, rows) of its held entries
+        self.parity = np.zeros(0, dtype=np.int64)  # Per-slot round tag, flipped each round the slot is sent
+        self.loot = (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64))
+    def reset(self, slot):
+        """Forget everything sent to `slot`; a new client there starts from a full snapshot."""
+        for name, held in self.held.items():
+            if slot < len(held): held[slot] = -1
+            s, r = self.shown[name]; keep = s != slot; self.shown[name] = s[keep], r[keep]
+        pairs, keys = self.loot; keep = (pairs >> 32) != slot; self.loot = pairs[keep], keys[keep]
+
+    def _visible(self, centres, pos, rows=None):
+        """(client, row) pairs with the row's position within RADAR_RANGE of the client, grouped by client."""
+        ci, r = game.CellIndex(pos, rows, cell_size=VIEW_CELL).candidates(centres, game.RADAR_RANGE)
+        dx, dy = pos[:, 0][r] - centres[:, 0][ci], pos[:, 1][r] - centres[:, 1][ci]  # 1-D gathers beat 2-D ones
+        keep = np.flatnonzero(dx * dx + dy * dy < game.RADAR_RANGE ** 2)
+        keep = keep[np.argsort(ci[keep].astype(np.int16), kind="stable")]  # 16-bit keys get a radix sort
+        return ci[keep], r[keep]
+
+    def _table(self, name, slots, n_rows):
+        """The held-key table for section `name`, grown to cover `slots` and `n_rows` rows."""
+        held = self.held.get(name)
+        have = (0, 0) if held is None else held.shape
+        need = (max(int(slots.max()) + 1, have[0]), max(n_rows, have[1]))
+        if held is None or held.shape != need:
+            grown = np.full(need, -1, dtype=np.int64)
+            if held is not None: grown[:have[0], :have[1]] = held
+            held = self.held[name] = grown
+            self.shown.setdefault(name, (np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)))
+        return held
+
+    def _delta(self, name, slots, tag, ci, rows, keys, n_rows):
+        """Indices of the visible (client, row) pairs whose record changed, plus the (client, row)
+        pairs that left view, grouped by client. Records the new state as delivered."""
+        held, s = self._table(name, slots, n_rows), slots[ci]
+        width = held.shape[1]; cells, at = held.reshape(-1), s * width + rows
+        send = np.flatnonzero((cells[at] & KEY_MASK) != keys)
+        cells[at] = keys | tag[s]
+        was_s, was_r = self.shown[name]
+        in_round = np.zeros(len(held), dtype=bool); in_round[slots] = True
+        mine = in_round[was_s]
+        ps, pr = was_s[mine], was_r[mine]
+        left = (cells[ps * width + pr] & ROUND_TAG) != tag[ps]  # Not rewritten this round, so out of view
+        cells[ps[left] * width + pr[left]] = -1
+        self.shown[name] = np.concatenate((was_s[~mine], s)), np.concatenate((was_r[~mine], rows))
+        client_of = np.zeros(len(held), dtype=np.int64); client_of[slots] = np.arange(len(slots))
+        gi = client_of[ps[left]]; by_client = np.argsort(gi.astype(np.int16), kind="stable")
+        return send, (gi[by_client], pr[left][by_client])
+
+    def _loot(self, slots, ci, uids, keys):
+        """_delta for drops, over sorted (slot << 32 | uid) keys instead of a table."""
+        pairs = (slots[ci].astype(np.int64) << 32) | uids
+        held_pairs, held_keys = self.loot
+        in_round = np.isin(held_pairs >> 32, slots)
+        before, before_keys = held_pairs[in_round], held_keys[in_round]
+        at = np.minimum(np.searchsorted(before, pairs), max(len(before) - 1, 0))
+        known = (before[at] == pairs) & (before_keys[at] == keys) if len(before) else np.zeros(len(pairs), dtype=bool)
+        order = np.argsort(pairs); now = pairs[order]
+        at = np.minimum(np.searchsorted(now, before), max(len(now) - 1, 0))
+        gone = before[(now[at] != before) if len(now) else np.ones(len(before), dtype=bool)]
+        merged = np.concatenate((held_pairs[~in_round], now)); by_pair = np.argsort(merged)
+        self.loot = merged[by_pair], np.concatenate((held_keys[~in_round], keys[order]))[by_pair]
+        client_of = np.zeros(int(slots.max()) + 1, dtype=np.int64); client_of[slots] = np.arange(len(slots))
+        gi = client_of[gone >> 32]; by_client = np.argsort(gi, kind="stable")
+        return np.flatnonzero(~known), (gi[by_client], (gone[by_client] & 0xFFFFFFFF).astype("<u4"))
+
+    def payloads(self, world, slots):
+        """Framed snapshot bytes for each client slot in the array `slots`, in the same order."""
+        t, k, pl = world.snapshot_tables(), len(slots), world.players
+        centre = pl.pos[slots]
+        if len(self.parity) < len(pl.active): self.parity = np.zeros(len(pl.active), dtype=np.int64)
+        self.parity[slots] ^= ROUND_TAG; tag = self.parity
+
+        ci, rows = self._visible(centre, t["player_pos"], np.flatnonzero(t["player_live"]))
+        mine = slots[ci] == rows; ci, rows = ci[~mine], rows[~mine]
+        send, (gi, gone) = self._delta("players", slots, tag, ci, rows, record_keys(t["players"])[rows], len(t["players"]))
+        sections = [split_by_client(ci[send], opaque(t["players"])[rows[send]], k), split_by_client(gi, gone.astype("<u2"), k)]
+        ci, rows = self._visible(centre, t["bee_pos"], np.flatnonzero(t["bee_live"]))
+        send, (gi, gone) = self._delta("bees", slots, tag, ci, rows, record_keys(t["bees"])[rows], len(t["bees"]))
+        sections += [split_by_client(ci[send], opaque(t["bees"])[rows[send]], k), split_by_client(gi, t["bees"]["idx"][gone], k)]
+        ci, rows = self._visible(centre, t["missile_pos"])
+        sections.append(split_by_client(ci, opaque(t["missiles"])[rows], k))
+        ci, rows = self._visible(centre, t["loot_pos"])
+        send, (gi, gone) = self._loot(slots, ci, t["loot"]["uid"][rows].astype(np.int64), record_keys(t["loot"])[rows])
+        sections += [split_by_client(ci[send], opaque(t["loot"])[rows[send]], k), split_by_client(gi, gone, k)]
+
+        tick, now = world.clock.ticks & 0xFFFFFFFF, world.clock.now
+        ready = np.packbits(pl.petal_ready_at[slots] <= now, axis=1, bitorder="little")[:, 0]
+        headers = zip(np.rint(centre[:, 0]).astype(int).tolist(), np.rint(centre[:, 1]).astype(int).tolist(),
+                      np.clip(pl.health[slots], -0x8000, 0x7FFF).tolist(), quantize_angle(pl.orbit[slots]).tolist(),
+                      ready.tolist(), pl.lvl[slots].tolist(), pl.xp[slots].tolist())
+        out = []
+        for i, header in enumerate(headers):
+            parts = [SNAP_HEADER.pack(MSG_SNAPSHOT, tick, *header)]
+            for section in sections:
+                n, data = section[i]; parts.append(COUNT.pack(n)); parts.append(data)
+            out.append(frame(b"".join(parts)))
+        return out
+
+# --- SERVER ---
+
+class GameServer:
+    """Accepts clients, applies their input between ticks and broadcasts snapshots. The tick loop
+    is a fixed-timestep accumulator like florrio.main(), and is the only code touching the world."""
+    def __init__(self, world, snapshot_hz=SNAPSHOT_HZ, stats_interval=STATS_INTERVAL):
+        self.world, self.snapshot_every = world, max(1, round(game.SIM_HZ / snapshot_hz))
+        self.clients, self.interest = {}, InterestManager()  # slot -> writer
+        self.stats_interval = stats_interval
+        self.tick_ns, self.round_ns = deque(maxlen=game.SIM_HZ * 10), deque(maxlen=snapshot_hz * 10)
+        self.bytes_sent, self.snapshots_sent, self.snapshots_skipped = 0, 0, 0
+
+    async def handle_client(self, reader, writer):
+        slot = self.world.players.join()
+        if slot is None: writer.close(); return
+        self.clients[slot] = writer; self.interest.reset(slot)
+        writer.write(frame(WELCOME.pack(MSG_WELCOME, slot, round(game.SIM_HZ / self.snapshot_every), game.WORLD_SIZE)))
+        pl = self.world.players
+        try:
+            while True:
+                msg = await read_message(reader)
+                if msg[0] == MSG_INPUT:
+                    _, ax, ay = INPUT.unpack(msg)
+                    pl.aim[slot] = (min(max(ax, -MAX_AIM[0]), MAX_AIM[0]), min(max(ay, -MAX_AIM[1]), MAX_AIM[1]))
+                elif msg[0] == MSG_RESPAWN and pl.health[slot] <= 0:
+                    pl.spawn(slot)
+        except (asyncio.IncompleteReadError, ConnectionError, struct.error, IndexError):
+            pass
+        finally:
+            del self.clients[slot]; pl.leave(slot)
+            writer.close()
+
+    def broadcast(self):
+        ready = []
+        for slot, writer in self.clients.items():
+            if writer.is_closing(): continue
+            if writer.transport.get_write_buffer_size() > MAX_BACKLOG:
+                self.snapshots_skipped += 1; continue  # Slow reader: the next delta covers this one
+            ready.append(slot)
+        if not ready: return
+        for slot, payload in zip(ready, self.interest.payloads(self.world, np.array(ready))):
+            self.clients[slot].write(payload)
+            self.bytes_sent += len(payload); self.snapshots_sent += 1
+
+    def report(self):
+        def pct(samples):
+            return np.percentile(np.fromiter(samples, dtype=np.int64), (50, 95, 99)) / 1e6 if samples else np.zeros(3)
+        t, r = pct(self.tick_ns), pct(self.round_ns)
+        per_player = self.bytes_sent / max(1, self.snapshots_sent) * game.SIM_HZ / self.snapshot_every  # Bytes/s at full rate
+        print(f"players {len(self.world.players):4d}  tick p50 {t[0]:6.2f} p95 {t[1]:6.2f} p99 {t[2]:6.2f} ms  "
+              f"snapshot round p50 {r[0]:6.2f} p95 {r[1]:6.2f} ms  {per_player / 1024:6.2f} KiB/s/player  "
+              f"skipped {self.snapshots_skipped}", flush=True)
+        self.bytes_sent = self.snapshots_sent = self.snapshots_skipped = 0
+
+    async def run(self, host=SERVER_HOST, port=SERVER_PORT, duration=None):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"serving on {host}:{port}, {game.SIM_HZ} ticks/s, snapshots every {self.snapshot_every} ticks", flush=True)
+        loop, stop = asyncio.get_running_loop(), asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)  # Replaces the handlers SDL installs, which only post a QUIT event
+        start = last = last_report = loop.time()
+        accumulator = 0.0
+        async with server:
+            while not stop.is_set() and (duration is None or last - start < duration):
+                now = loop.time()
+                accumulator += min(now - last, game.MAX_FRAME_TIME); last = now
+                while accumulator >= game.SIM_DT:
+                    accumulator -= game.SIM_DT
+                    t0 = time.perf_counter_ns(); self.world.step(); t1 = time.perf_counter_ns()
+                    self.tick_ns.append(t1 - t0)
+                    if self.world.clock.ticks % self.snapshot_every == 0:
+                        self.broadcast(); self.round_ns.append(time.perf_counter_ns() - t1)
+                if self.stats_interval and now - last_report >= self.stats_interval:
+                    self.report(); last_report = now
+                await asyncio.sleep(max(0.0, game.SIM_DT - accumulator - (loop.time() - now)))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--bees", type=int, default=game.BEE_COUNT)
+    parser.add_argument("--seed", type=int)
+    parser.add_argument("--snapshot-hz", type=int, default=SNAPSHOT_HZ)
+    parser.add_argument("--duration", type=float, help="stop after this many seconds")
+    args = parser.parse_args(argv)
+    server = GameServer(World(args.bees, seed=args.seed), snapshot_hz=args.snapshot_hz)
+    asyncio.run(server.run(args.host, args.port, args.duration))
+
+if __name__ == "__main__":
+    main()